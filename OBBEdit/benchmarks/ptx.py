@@ -0,0 +1,14 @@
+# Time decoding 2048x2048 PTX textures
+import sys
+from os.path import dirname, realpath
+from timeit import repeat
+
+sys.path.insert(0, dirname(dirname(realpath(__file__))))
+from libraries.pyvz2ptx import rsb_ptx_decoders
+
+if __name__ == "__main__":
+	data = bytes(range(256)) * 65536
+	for FORMAT, decoder in rsb_ptx_decoders.items():
+		PITCH = 8192 if FORMAT == 0 else 4096
+		seconds = min(repeat(lambda: decoder(data, 2048, 2048, PITCH), number = 1, repeat = 3))
+		print(decoder.__name__ + ": " + format(seconds, ".4f") + "s")
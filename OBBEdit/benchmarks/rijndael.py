@@ -0,0 +1,23 @@
+# Time importing the Rijndael library against computing its tables
+import sys
+from os.path import dirname, realpath
+from subprocess import run
+from timeit import repeat
+
+sys.path.insert(0, dirname(dirname(realpath(__file__))))
+from libraries import pyvz2rijndael
+
+def import_time():
+# Seconds to import the library in a new interpreter
+	code = "from time import perf_counter\nstart = perf_counter()\nimport libraries.pyvz2rijndael\nprint(perf_counter() - start)"
+	return float(run([sys.executable, "-c", code], cwd = dirname(dirname(realpath(__file__))), capture_output = True, check = True, text = True).stdout)
+
+if __name__ == "__main__":
+	names = ("S", "Si", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "T8", "U1", "U2", "U3", "U4", "r_con")
+	for name, table in zip(names, pyvz2rijndael.compute_tables()):
+		if tuple(table) != getattr(pyvz2rijndael, name):
+			raise ValueError("Precomputed table " + name + " is wrong")
+	import_time() # Write the bytecode cache
+	print("import: " + format(min(import_time() for i in range(10)), ".4f") + "s")
+	print("compute_tables: " + format(min(repeat(pyvz2rijndael.compute_tables, number = 1, repeat = 10)), ".4f") + "s")
+	print("RijndaelCBC: " + format(min(repeat(lambda: pyvz2rijndael.RijndaelCBC(b"00000000000000000000000000000000", 24), number = 1, repeat = 10)), ".4f") + "s")
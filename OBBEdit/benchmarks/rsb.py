@@ -0,0 +1,76 @@
+# Time the RSG file list parser against the old byte by byte loop
+from io import BytesIO
+import sys
+from os.path import dirname, realpath
+from struct import pack, unpack
+from timeit import repeat
+
+sys.path.insert(0, dirname(dirname(realpath(__file__))))
+from libraries.pyvz2rsb import rsg_file_list
+
+def name_table(entries):
+# Encode sorted (name, record) pairs like in a RSG
+	table = bytearray()
+	def branch(entries, depth):
+		groups = []
+		for name, record in entries:
+			char = name[depth] if depth < len(name) else 0
+			if groups and groups[-1][0] == char:
+				groups[-1][1].append((name, record))
+			else:
+				groups.append((char, [(name, record)]))
+		for i, (char, group) in enumerate(groups):
+			start = len(table)
+			table.extend(bytes([char]) + b"\0\0\0")
+			if char == 0:
+				table.extend(group[0][1])
+			else:
+				branch(group, depth + 1)
+			if i < len(groups) - 1:
+				table[start + 1: start + 4] = pack("<I", len(table) // 4)[:3]
+	branch(sorted(entries), 0)
+	return bytes(table)
+def old_file_list(file, INFO_OFFSET, INFO_LIMIT):
+# The old parser
+	file_list = []
+	NAME_DICT = {}
+	temp = INFO_OFFSET
+	file.seek(INFO_OFFSET)
+	while temp < INFO_LIMIT:
+		FILE_NAME = b""
+		for key in list(NAME_DICT.keys()):
+			if NAME_DICT[key] + INFO_OFFSET < temp:
+				NAME_DICT.pop(key)
+			else:
+				FILE_NAME = key
+		BYTE = b""
+		while BYTE != b"\0":
+			FILE_NAME += BYTE
+			BYTE = file.read(1)
+			LENGTH = 4 * unpack("<I", file.read(3) + b"\0")[0]
+			if LENGTH != 0:
+				NAME_DICT[FILE_NAME] = LENGTH
+		IS_IMAGE = unpack("<I", file.read(4))[0] == 1
+		FILE_OFFSET = unpack("<I", file.read(4))[0]
+		FILE_SIZE = unpack("<I", file.read(4))[0]
+		if IS_IMAGE:
+			file.seek(20, 1)
+		file_list.append((FILE_NAME.decode(), IS_IMAGE, FILE_OFFSET, FILE_SIZE))
+		temp = file.tell()
+	return file_list
+def benchmark(name, entries):
+	data = b"\0" * 92 + name_table(entries)
+	old = old_file_list(BytesIO(data), 92, len(data))
+	new = rsg_file_list(memoryview(data), 92, len(data))
+	if old != [(entry.name, entry.is_image, entry.offset, entry.size) for entry in new]:
+		raise ValueError("Different output for " + name)
+	seconds = min(repeat(lambda: old_file_list(BytesIO(data), 92, len(data)), number = 1, repeat = 3))
+	print(name + ": old " + format(seconds, ".4f") + "s")
+	seconds = min(repeat(lambda: rsg_file_list(memoryview(data), 92, len(data)), number = 1, repeat = 3))
+	print(name + ": new " + format(seconds, ".4f") + "s")
+
+if __name__ == "__main__":
+	entries = [(b"PACKAGES\\LEVELS\\WORLD%d\\LEVEL%05d.RTON" % (i % 20, i), pack("<3I", 0, 4096 * i, 4096)) for i in range(40000)]
+	benchmark("40000 levels", entries)
+	entries = [(b"IMAGES\\" + b"\\".join(b"DIR%d" % (i >> bit & 3) for bit in range(0, 24, 2)) + b"\\IMAGE.PTX", pack("<8I", 1, 4096 * i, 4096, i, 0, 0, 64, 64)) for i in range(20000)]
+	benchmark("20000 deep images", entries)
@@ -0,0 +1,47 @@
+# Time the recursive and the iterative RTON decoder on deep and wide files
+import sys
+from os.path import dirname, realpath
+from timeit import repeat
+
+sys.path.insert(0, dirname(dirname(realpath(__file__))))
+from libraries.pyvz2rton import RTONDecoder
+
+def deep_rton(depth):
+# Objects nested depth times
+	return b"RTON\x01\0\0\0\x90\x01a\x85" + b"\x91\0\x85" * (depth - 1) + b"\xff" * (depth + 1) + b"DONE"
+def wide_rton(width):
+# Object with width keys followed by a list of width numbers
+	items = b"".join(b"\x90" + bytes([len(key)]) + key + b"$" + bytes([i & 0x7f]) for i, key in enumerate(b"key_%d" % i for i in range(width)))
+	number = b""
+	integ = width
+	while integ > 127:
+		number += bytes([integ & 0x7f | 0x80])
+		integ >>= 7
+	number += bytes([integ])
+	return b"RTON\x01\0\0\0" + items + b"\x90\x04list\x86\xfd" + number + b"\x08\x01" * width + b"\xfe\xffDONE"
+def recursive(decoder, data):
+	decoder.name = "recursive"
+	return decoder.parse_object(data, 8, decoder.currrent_indent, [], [])[0]
+def iterative(decoder, data):
+	return decoder.parse_root_data(data, 4, "iterative")
+def benchmark(name, data, functions, decoder):
+	for function in functions:
+		try:
+			seconds = min(repeat(lambda: function(decoder, data), number = 1, repeat = 5))
+			print(name + ": " + function.__name__ + " " + format(seconds, ".4f") + "s")
+		except RecursionError:
+			print(name + ": " + function.__name__ + " RecursionError")
+
+if __name__ == "__main__":
+	for depth in (100, 300):
+		data = deep_rton(depth)
+		if recursive(RTONDecoder(), data) != iterative(RTONDecoder(), data):
+			raise ValueError("Different output for depth " + repr(depth))
+		benchmark("deep " + repr(depth), data, (recursive, iterative), RTONDecoder())
+	# Indented output grows quadratically with the depth
+	benchmark("deep 100000 compact", deep_rton(100000), (recursive, iterative), RTONDecoder(b",", b"", b":", indent = b""))
+	for width in (10000, 200000):
+		data = wide_rton(width)
+		if recursive(RTONDecoder(), data) != iterative(RTONDecoder(), data):
+			raise ValueError("Different output for width " + repr(width))
+		benchmark("wide " + repr(width), data, (recursive, iterative), RTONDecoder())
@@ -1,10 +1,16 @@
+from contextlib import contextmanager
 import datetime
-from io import StringIO
-from json import load
-from os import listdir, system
+from heapq import heappush, heapreplace
+from io import BytesIO, StringIO
+from json import dump, load
+from mmap import mmap, ACCESS_READ
+from os import listdir, makedirs, remove, replace, system
 from os.path import dirname, isfile, join as osjoin, realpath, splitext
 import sys
+from tempfile import TemporaryFile
+from time import perf_counter
 from traceback import format_exc
+from zlib import compressobj, decompressobj, error as zlib_error
 def initialize():
 	system("")
 	if getattr(sys, "frozen", False):
@@ -13,6 +19,10 @@ def initialize():
 		return sys.path[0]
 class LogError:
 	def __init__(self, fail):
+		if fail is None: # Log in memory
+			self.fail = StringIO()
+			self.fail.name = None
+			return
 		try:
 			self.fail = open(fail, "w")
 		except PermissionError as e:
@@ -30,6 +40,11 @@ class LogError:
 		self.fail.write("\t" + string + "\n")
 		self.fail.flush()
 		print("\33[93m" + string + "\33[0m")
+	def log(self, string):
+	# Log output of another log
+		if string:
+			self.fail.write(string)
+			self.fail.flush()
 	
 	def check_version(self, mayor = 2, minor = 0, micro = 0):
 		if sys.version_info[:3] < (mayor, minor, micro):
@@ -149,4 +164,160 @@ def path_input(text, preset):
 		return processed_string
 def list_levels(levels):
 	blue_print("""
-""" +  " ".join([repr(i) + "-" + levels[i] for i in range(len(levels))]))
\ No newline at end of file
+""" +  " ".join([repr(i) + "-" + levels[i] for i in range(len(levels))]))
+@contextmanager
+def temp_output(path):
+# Write to a temporary file next to path, it only replaces path if nothing went wrong
+	temp = path + ".tmp"
+	try:
+		with open(temp, "wb") as output:
+			yield output
+		replace(temp, path)
+	except BaseException:
+		try:
+			remove(temp)
+		except OSError:
+			pass
+		raise
+class NamedMap(mmap):
+# Read only memory map that keeps the name of the file it was made from
+	pass
+class NamedBuffer(BytesIO):
+# In memory stand-in for a NamedMap when there's nothing to map
+	def __len__(self):
+		return self.getbuffer().nbytes
+def decompress_stream(src, dst, chunk_size = 1048576):
+# Decompress zlib data from src to dst in chunks, returns the number of bytes written
+	decompressor = decompressobj()
+	size = 0
+	while not decompressor.eof:
+		chunk = decompressor.unconsumed_tail or src.read(chunk_size)
+		if chunk:
+			data = decompressor.decompress(chunk, chunk_size)
+		else:
+			data = decompressor.flush()
+			if not decompressor.eof:
+				raise zlib_error("Error -5 while decompressing data: incomplete or truncated stream")
+		dst.write(data)
+		size += len(data)
+	return size
+class BytearrayOutput:
+# Write to a bytearray of the expected size like a file, it only grows if more is written
+	def __init__(self, size):
+		self.data = bytearray(size)
+		self.size = 0
+	def write(self, data):
+		self.data[self.size: self.size + len(data)] = data
+		self.size += len(data)
+def decompress_bytearray(src, size):
+# Decompress zlib data from src into a single bytearray, size is the expected size so it doesn't have to be copied to grow
+	output = BytearrayOutput(size)
+	decompress_stream(src, output)
+	del output.data[output.size:]
+	return output.data
+def decompress_map(src, name):
+# Decompress zlib data from src to a temporary file and map it
+	with TemporaryFile() as temp:
+		if decompress_stream(src, temp) == 0:
+			# Empty files can't be mapped
+			file = NamedBuffer()
+		else:
+			temp.flush()
+			file = NamedMap(temp.fileno(), 0, access = ACCESS_READ)
+	file.name = name
+	return file
+def compress_stream(data, dst, level = 9, chunk_size = 1048576):
+# Compress data to dst in chunks
+	compressor = compressobj(level)
+	data = memoryview(data)
+	for i in range(0, len(data), chunk_size):
+		dst.write(compressor.compress(data[i:i + chunk_size]))
+	dst.write(compressor.flush())
+class Stats:
+# Seconds, files & bytes in & out of every stage and the slowest files
+	def __init__(self, slowest):
+		self.slowest = slowest
+		self.reset()
+	def reset(self):
+	# Forget what was counted
+		self.stages = {} # Stage -> [seconds, files, bytes in, bytes out]
+		self.files = [] # Heap of the slowest files: (seconds, name)
+	def add(self, stage, start, size_in = 0, size_out = 0, files = 1):
+	# Count the time since start (perf_counter) & the bytes of a stage
+		seconds = perf_counter() - start
+		totals = self.stages.setdefault(stage, [0.0, 0, 0, 0])
+		totals[0] += seconds
+		totals[1] += files
+		totals[2] += size_in
+		totals[3] += size_out
+	def file(self, name, start):
+	# Remember a file handled since start if it's one of the slowest
+		self.add_file(perf_counter() - start, name)
+	def add_file(self, seconds, name):
+	# Remember a file that took seconds if it's one of the slowest
+		if len(self.files) < self.slowest:
+			heappush(self.files, (seconds, name))
+		elif self.files and seconds > self.files[0][0]:
+			heapreplace(self.files, (seconds, name))
+	def result(self):
+	# Stages & files to merge in another process
+		return (self.stages, self.files)
+	def merge(self, result):
+	# Add the stages & files counted by another process
+		stages, files = result
+		for stage, (seconds, count, size_in, size_out) in stages.items():
+			totals = self.stages.setdefault(stage, [0.0, 0, 0, 0])
+			totals[0] += seconds
+			totals[1] += count
+			totals[2] += size_in
+			totals[3] += size_out
+		for seconds, name in files:
+			self.add_file(seconds, name)
+	def report(self, seconds):
+	# Machine readable report, stages sorted by their time
+		return {
+			"seconds": seconds,
+			"stages": dict((stage, {
+				"seconds": totals[0],
+				"files": totals[1],
+				"bytesIn": totals[2],
+				"bytesOut": totals[3]
+			}) for stage, totals in sorted(self.stages.items(), key = lambda item: -item[1][0])),
+			"slowestFiles": [{
+				"file": name,
+				"seconds": seconds
+			} for seconds, name in sorted(self.files, reverse = True)]
+		}
+	def finish(self, path, seconds):
+	# Write the report to path & print a summary
+		report = self.report(seconds)
+		with open(path, "w") as file:
+			dump(report, file, indent = 4)
+		for stage, totals in report["stages"].items():
+			print(stage + ": " + format(totals["seconds"], ".3f") + "s, " + repr(totals["files"]) + " files, " + repr(totals["bytesIn"]) + " -> " + repr(totals["bytesOut"]) + " bytes")
+		if report["slowestFiles"]:
+			print("slowest files:")
+			for entry in report["slowestFiles"]:
+				print("\t" + format(entry["seconds"], ".3f") + "s " + entry["file"])
+		blue_print("wrote " + path)
+class FileWriter:
+# Write extracted files, only making each directory once
+	def __init__(self, stats = None):
+		self.directories = set() # Directories that were already made
+		self.stats = stats
+	def makedirs(self, path):
+	# Make the directory of a file if it wasn't made yet
+		directory = dirname(path)
+		if not directory in self.directories:
+			makedirs(directory, exist_ok = True)
+			self.directories.add(directory)
+	def write(self, path, data, message = None):
+	# Write data to path & print message
+		start = perf_counter()
+		self.makedirs(path)
+		with open(path, "wb") as output:
+			output.write(data)
+		if self.stats is not None:
+			self.stats.add("write", start, 0, len(data))
+		if message:
+			print(message)
@@ -0,0 +1,136 @@
+# PTX texture formats, needs numpy
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+def pixels(data, dtype, channels, width, height, pitch):
+# Rows of pixels, pitch is the number of bytes in a row
+	row = numpy.frombuffer(data, numpy.uint8, height * pitch).reshape(height, pitch)
+	array = numpy.ascontiguousarray(row[:, :width * max(channels, 1) * numpy.dtype(dtype).itemsize]).view(dtype)
+	if channels:
+		return array.reshape(height, width, channels)
+	return array
+def block_pixels(data, width, height):
+# Pixels stored in 32x32 blocks, rows of blocks from the top left
+	BLOCKS_X = -(-width // 32)
+	BLOCKS_Y = -(-height // 32)
+	array = numpy.frombuffer(data, "<u2", BLOCKS_X * BLOCKS_Y * 1024).reshape(BLOCKS_Y, BLOCKS_X, 32, 32)
+	return array.swapaxes(1, 2).reshape(BLOCKS_Y * 32, BLOCKS_X * 32)[:height, :width]
+def expand(value, bits):
+# Scale a channel of bits to 8 bits
+	return (value << 8 - bits | value >> 2 * bits - 8).astype(numpy.uint8)
+def rgba4444(array):
+	return numpy.dstack((expand(array >> 12, 4), expand(array >> 8 & 15, 4), expand(array >> 4 & 15, 4), expand(array & 15, 4)))
+def rgb565(array):
+	return numpy.dstack((expand(array >> 11, 5), expand(array >> 5 & 63, 6), expand(array & 31, 5)))
+def rgba5551(array):
+	return numpy.dstack((expand(array >> 11, 5), expand(array >> 6 & 31, 5), expand(array >> 1 & 31, 5), ((array & 1) * 255).astype(numpy.uint8)))
+
+# Decoders return an array of RGB(A) rows
+def ARGB8888(data, width, height, pitch):
+	return pixels(data, numpy.uint8, 4, width, height, pitch)[:, :, [2, 1, 0, 3]]
+def ABGR8888(data, width, height, pitch):
+	return pixels(data, numpy.uint8, 4, width, height, pitch)
+def RGBA4444(data, width, height, pitch):
+	return rgba4444(pixels(data, "<u2", 0, width, height, pitch))
+def RGB565(data, width, height, pitch):
+	return rgb565(pixels(data, "<u2", 0, width, height, pitch))
+def RGBA5551(data, width, height, pitch):
+	return rgba5551(pixels(data, "<u2", 0, width, height, pitch))
+def RGBA4444Block32x32(data, width, height, pitch):
+	return rgba4444(block_pixels(data, width, height))
+def RGB565Block32x32(data, width, height, pitch):
+	return rgb565(block_pixels(data, width, height))
+def RGBA5551Block32x32(data, width, height, pitch):
+	return rgba5551(block_pixels(data, width, height))
+
+def rows(array, height, pitch):
+# Bytes of rows of pixels padded to pitch
+	row = array.reshape(height, -1).view(numpy.uint8)
+	if row.shape[1] < pitch:
+		row = numpy.pad(row, ((0, 0), (0, pitch - row.shape[1])))
+	return row.tobytes()
+def blocks(array, width, height):
+# Bytes of pixels in 32x32 blocks, rows of blocks from the top left
+	BLOCKS_X = -(-width // 32)
+	BLOCKS_Y = -(-height // 32)
+	array = numpy.pad(array, ((0, BLOCKS_Y * 32 - height), (0, BLOCKS_X * 32 - width)))
+	return array.reshape(BLOCKS_Y, 32, BLOCKS_X, 32).swapaxes(1, 2).tobytes()
+def shrink(channel, bits):
+# Scale an 8 bit channel to bits
+	return channel.astype("<u2") >> 8 - bits
+def pack4444(image):
+	image = numpy.asarray(image)
+	return shrink(image[:, :, 0], 4) << 12 | shrink(image[:, :, 1], 4) << 8 | shrink(image[:, :, 2], 4) << 4 | shrink(image[:, :, 3], 4)
+def pack565(image):
+	image = numpy.asarray(image)
+	return shrink(image[:, :, 0], 5) << 11 | shrink(image[:, :, 1], 6) << 5 | shrink(image[:, :, 2], 5)
+def pack5551(image):
+	image = numpy.asarray(image)
+	return shrink(image[:, :, 0], 5) << 11 | shrink(image[:, :, 1], 5) << 6 | shrink(image[:, :, 2], 5) << 1 | shrink(image[:, :, 3], 1)
+
+# Encoders take an array or image of RGBA rows
+def ARGB8888_encode(image, width, height, pitch):
+	return rows(numpy.ascontiguousarray(numpy.asarray(image)[:, :, [2, 1, 0, 3]]), height, pitch)
+def ABGR8888_encode(image, width, height, pitch):
+	return rows(numpy.ascontiguousarray(numpy.asarray(image)), height, pitch)
+def RGBA4444_encode(image, width, height, pitch):
+	return rows(pack4444(image), height, pitch)
+def RGB565_encode(image, width, height, pitch):
+	return rows(pack565(image), height, pitch)
+def RGBA5551_encode(image, width, height, pitch):
+	return rows(pack5551(image), height, pitch)
+def RGBA4444Block32x32_encode(image, width, height, pitch):
+	return blocks(pack4444(image), width, height)
+def RGB565Block32x32_encode(image, width, height, pitch):
+	return blocks(pack565(image), width, height)
+def RGBA5551Block32x32_encode(image, width, height, pitch):
+	return blocks(pack5551(image), width, height)
+
+def ptx_textures(ptx_info, functions):
+# Decoder or encoder, width, height & pitch of PTX entries, None if their format isn't supported
+	return [(functions[ptx.format], ptx.width, ptx.height, ptx.pitch) if ptx.format in functions else None for ptx in ptx_info]
+
+if numpy is None:
+	rsb_ptx_decoders = obb_ptx_decoders = {}
+	rsb_ptx_encoders = obb_ptx_encoders = {}
+else:
+	rsb_ptx_decoders = {
+		0: ARGB8888,
+		1: RGBA4444,
+		2: RGB565,
+		3: RGBA5551,
+		21: RGBA4444Block32x32,
+		22: RGB565Block32x32,
+		23: RGBA5551Block32x32
+	}
+	obb_ptx_decoders = dict(rsb_ptx_decoders)
+	obb_ptx_decoders[0] = ABGR8888
+	rsb_ptx_encoders = {
+		0: ARGB8888_encode,
+		1: RGBA4444_encode,
+		2: RGB565_encode,
+		3: RGBA5551_encode,
+		21: RGBA4444Block32x32_encode,
+		22: RGB565Block32x32_encode,
+		23: RGBA5551Block32x32_encode
+	}
+	obb_ptx_encoders = dict(rsb_ptx_encoders)
+	obb_ptx_encoders[0] = ABGR8888_encode
+# Not supported yet:
+# 5: DXT5,
+# 30: PVRTC_4BPP_RGBA,
+# 31: PVRTC_2BPP_RGBA,
+# 32: ETC1_RGB,
+# 33: ETC2_RGB,
+# 34: ETC2_RGBA,
+# 35: DXT1_RGB,
+# 36: DXT3_RGBA,
+# 37: DXT5_RGBA,
+# 38: ATITC_RGB,
+# 39: ATITC_RGBA,
+# 147: ETC1_RGB_A8,
+# 148: PVRTC_4BPP_RGB_A8,
+# 149: XRGB8888_A8,
+# 150: ETC1_RGB_A_Palette
@@ -0,0 +1,114 @@
+from array import array
+from collections import namedtuple
+from struct import Struct
+from sys import byteorder
+# RSB & RSG structures shared by unpack.py & patch.py
+class Record:
+# Fixed size structure read with a single unpack, layout is its Struct
+	__slots__ = ()
+	@classmethod
+	def unpack_from(cls, data, offset = 0):
+		return cls._make(cls.layout.unpack_from(data, offset))
+	def pack(self):
+		return self.layout.pack(*self)
+	def pack_into(self, data, offset = 0):
+		self.layout.pack_into(data, offset, *self)
+
+class RSBHeader(Record, namedtuple("RSBHeader", ("magic", "version", "unknown_8", "header_size", "file_list_size", "file_list_offset", "unknown_24", "subgroup_list_size", "subgroup_list_offset", "subgroup_info_entries", "subgroup_info_offset", "subgroup_info_entry_size", "group_info_entries", "group_info_offset", "group_info_entry_size", "group_list_size", "group_list_offset", "autopool_info_entries", "autopool_info_offset", "autopool_info_entry_size", "ptx_info_entries", "ptx_info_offset", "ptx_info_entry_size", "directory_7_offset", "directory_8_offset", "directory_9_offset", "header_size_2"))):
+# Header of a RSB, header_size_2 is only in version 4 and None otherwise
+	__slots__ = ()
+	layout = Struct("<4sI4s3I8s20I")
+	layout_3 = Struct("<4sI4s3I8s19I")
+	@classmethod
+	def unpack_from(cls, data, offset = 0):
+		if cls.layout_3.unpack_from(data, offset)[1] == 4:
+			return cls._make(cls.layout.unpack_from(data, offset))
+		return cls._make(cls.layout_3.unpack_from(data, offset) + (None,))
+	def pack(self):
+		if self.header_size_2 is None:
+			return self.layout_3.pack(*self[:-1])
+		return self.layout.pack(*self)
+	def pack_into(self, data, offset = 0):
+		if self.header_size_2 is None:
+			self.layout_3.pack_into(data, offset, *self[:-1])
+		else:
+			self.layout.pack_into(data, offset, *self)
+
+class RSGHeader(Record, namedtuple("RSGHeader", ("magic", "version", "unknown_8", "compression_flags", "header_length", "data_offset", "compressed_data_size", "decompressed_data_size", "unknown_36", "image_data_offset", "compressed_image_data_size", "decompressed_image_data_size", "unknown_52", "info_size", "info_offset"))):
+# Header of a RSG
+	__slots__ = ()
+	layout = Struct("<4sI8s5I4s3I20s2I")
+
+class SubgroupInfo(Record, namedtuple("SubgroupInfo", ("name", "rsg_offset", "rsg_size", "subgroup_id", "compression_flags", "header_length", "data_offset", "compressed_data_size", "decompressed_data_size", "decompressed_data_size_b", "image_data_offset", "compressed_image_data_size", "decompressed_image_data_size", "unknown_176", "image_entries", "image_id"))):
+# Subgroup info entry of a RSB, the RSB keeps the real sizes of the RSG here
+	__slots__ = ()
+	layout = Struct("<128s12I20s2I")
+	def rsg_header(self, data, offset = 0):
+	# Header of the RSG at offset with the sizes from this entry
+		return RSGHeader.unpack_from(data, offset)._replace(magic = b"pgsr", compression_flags = self.compression_flags, header_length = self.header_length, data_offset = self.data_offset, compressed_data_size = self.compressed_data_size, decompressed_data_size = self.decompressed_data_size, image_data_offset = self.image_data_offset, compressed_image_data_size = self.compressed_image_data_size, decompressed_image_data_size = self.decompressed_image_data_size)
+	def with_rsg_header(self, header):
+	# This entry with the sizes from the header of its RSG
+		return self._replace(compression_flags = header.compression_flags, header_length = header.header_length, data_offset = header.data_offset, compressed_data_size = header.compressed_data_size, decompressed_data_size = header.decompressed_data_size, decompressed_data_size_b = header.decompressed_data_size, image_data_offset = header.image_data_offset, compressed_image_data_size = header.compressed_image_data_size, decompressed_image_data_size = header.decompressed_image_data_size)
+
+class PTXInfo(Record, namedtuple("PTXInfo", ("width", "height", "pitch", "format"))):
+# PTX info entry of a RSB, pitch is the number of bytes in a row
+	__slots__ = ()
+	layout = Struct("<4I")
+
+def rsb_subgroup_offsets(header):
+# Offsets of the subgroup info entries of a RSB, stepping by the entry size of the header
+	return range(header.subgroup_info_offset, header.subgroup_info_offset + header.subgroup_info_entries * header.subgroup_info_entry_size, header.subgroup_info_entry_size)
+def rsb_ptx_info(data, header):
+# Read the PTX info entries of a RSB
+	return [PTXInfo.unpack_from(data, offset) for offset in range(header.ptx_info_offset, header.ptx_info_offset + header.ptx_info_entries * header.ptx_info_entry_size, header.ptx_info_entry_size)]
+
+class RSGFile:
+# File entry of a RSG, info is the offset of its IS_IMAGE, FILE_OFFSET & FILE_SIZE fields, image is its PTX entry in the RSG
+	__slots__ = ("name", "is_image", "offset", "size", "info", "image")
+	def __init__(self, name, is_image, offset, size, info, image):
+		self.name = name
+		self.is_image = is_image
+		self.offset = offset
+		self.size = size
+		self.info = info
+		self.image = image
+
+def rsg_file_list(data, INFO_OFFSET, INFO_LIMIT):
+# Read the file entries of a RSG
+	# Every character of a name takes a word: the character and the word offset of the next branch with the same prefix
+	words = array("I")
+	words.frombytes(data[INFO_OFFSET: INFO_LIMIT - (INFO_LIMIT - INFO_OFFSET) % 4])
+	if byteorder == "big":
+		words.byteswap()
+
+	file_list = []
+	branches = [] # Offsets and prefixes of the branches still to come, the nearest on top
+	i = 0
+	end = len(words)
+	while i < end:
+		while branches and branches[-1][0] < i:
+			branches.pop()
+		if branches:
+			FILE_NAME = bytearray(branches[-1][1])
+			if branches[-1][0] == i:
+				branches.pop()
+		else:
+			FILE_NAME = bytearray()
+
+		word = words[i]
+		while word & 255:
+			if word > 255:
+				branches.append((word >> 8, bytes(FILE_NAME)))
+			FILE_NAME.append(word & 255)
+			i += 1
+			word = words[i]
+		if word > 255:
+			branches.append((word >> 8, bytes(FILE_NAME)))
+
+		if words[i + 1] == 1:
+			file_list.append(RSGFile(FILE_NAME.decode(), True, words[i + 2], words[i + 3], INFO_OFFSET + 4 * i + 4, words[i + 4]))
+			i += 9
+		else:
+			file_list.append(RSGFile(FILE_NAME.decode(), False, words[i + 2], words[i + 3], INFO_OFFSET + 4 * i + 4, None))
+			i += 4
+	return file_list
@@ -1,270 +1,609 @@
-from io import BytesIO
-from struct import unpack, pack, error
-from json import dumps, load
+from codecs import getincrementaldecoder
+from numbers import Integral, Real
+from re import compile
+from struct import Struct, error
+from json import detect_encoding, load, JSONDecodeError
+from json.decoder import scanstring
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+int8 = Struct("b")
+int16 = Struct("<h")
+uint16 = Struct("<H")
+int32 = Struct("<i")
+uint32 = Struct("<I")
+float32 = Struct("<f")
+int64 = Struct("<q")
+float64 = Struct("<d")
+uint64 = Struct("<Q")
+
+json_whitespace = compile(r"[ \t\n\r]*")
+json_number = compile(r"(-?(?:0|[1-9][0-9]*))(\.[0-9]+)?([eE][-+]?[0-9]+)?")
+json_constants = {"t": ("true", True), "f": ("false", False), "n": ("null", None), "N": ("NaN", float("NaN")), "I": ("Infinity", float("Infinity")), "-": ("-Infinity", float("-Infinity"))}
+# What write_root_object of JSONDecoder expects next
+JSON_VALUE, JSON_KEY_OR_CLOSE, JSON_KEY, JSON_COLON, JSON_VALUE_OR_CLOSE, JSON_COMMA_OR_CLOSE, JSON_ROOT, JSON_DONE = range(8)
+json_expected = ("Expecting value", "Expecting property name enclosed in double quotes", "Expecting property name enclosed in double quotes", "Expecting ':' delimiter", "Expecting value", "Expecting ',' delimiter", "Expecting '{'", "Extra data")
+
+def dispatch_tables(mappings, defaults):
+# Tables indexed by the integer value of a tag, one for each column
+	tables = [[default] * 256 for default in defaults]
+	for tag, functions in mappings.items():
+		for table, function in zip(tables, functions):
+			table[tag] = function
+	return tables
+
+class list2:
+# Extra list class
+	def __init__(self, data):
+		self.data = data
+
+class RTID(str):
+# String with the notation of an RTID
+	__slots__ = ()
 
 class RTONDecoder():
-	def __init__(self, comma = b",", currrent_indent = b"\r\n", doublePoint = b": ", ensureAscii = False, indent = b"    ", repairFiles = True, sortKeys = False, sortValues = False, warning_message = lambda x: None):
+	def __init__(self, comma = b",", currrent_indent = b"\r\n", doublePoint = b": ", ensureAscii = False, indent = b"    ", repairFiles = True, sortKeys = False, sortValues = False, warning_message = lambda x: None, object_pairs_hook = list2):
 		self.comma = comma
 		self.currrent_indent = currrent_indent
 		self.doublePoint = doublePoint
 		self.ensureAscii = ensureAscii
 		self.warning_message = warning_message
 		self.indent = indent
+		self.object_pairs_hook = object_pairs_hook
 		self.repairFiles = repairFiles
 		self.sortKeys = sortKeys
 		self.sortValues = sortValues
+		if ensureAscii:
+			self.encode_string = encode_basestring_ascii
+		else:
+			self.encode_string = encode_basestring
+		self.name = None
 
-	def parse_number(self, fp):
-		num = fp.read(1)[0]
+	def parse_number(self, data, pos):
+		num = data[pos]
+		if num < 128:
+			return (num, pos + 1)
 		result = num & 0x7f
 		i = 128
 		while num > 127:
-			num = fp.read(1)[0]
+			pos += 1
+			num = data[pos]
 			result += i * (num & 0x7f)
 			i *= 128
-		return result
-	def parse_text(self, fp):
+		return (result, pos + 1)
+	def parse_text(self, data, pos):
 	# types 81, 90
-		byte = fp.read(self.parse_number(fp))
+		length, pos = self.parse_number(data, pos)
+		end = pos + length
 		try:
-			return byte.decode()
+			return (str(data[pos:end], "utf-8"), end)
 		except Exception:
-			return byte.decode('latin-1')
-	def parse_utf8_text(self, fp):
-		i1 = self.parse_number(fp) # Character length
-		string = fp.read(self.parse_number(fp)).decode()
+			return (str(data[pos:end], "latin-1"), end)
+	def parse_utf8_text(self, data, pos):
+		i1, pos = self.parse_number(data, pos) # Character length
+		length, pos = self.parse_number(data, pos)
+		end = pos + length
+		string = str(data[pos:end], "utf-8")
 		i2 = len(string)
 		if i1 != i2:
-			self.warning_message("SilentError: " + fp.name + " pos " + str(fp.tell()) + ": Unicode string of character length " + str(i2) + " found, expected " + str(i1))
-		return string
+			self.warning_message("SilentError: " + self.name + " pos " + str(min(end, len(data))) + ": Unicode string of character length " + str(i2) + " found, expected " + str(i1))
+		return (string, end)
+	def end_of_file(self, data):
+	# Position to continue from after an abrupt end
+		pos = len(data)
+		if self.repairFiles:
+			self.warning_message("SilentError: " + self.name + " pos " + str(pos) + ": end of file")
+		else:
+			raise EOFError
+		return pos
+	def check_length(self, pos, i1, i2):
+		if i1 != i2:
+			self.warning_message("SilentError: " + self.name + " pos " + str(pos) + ": Array of length " + str(i1) + " found, expected " + str(i2))
 
-	def parse_false(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+	def parse_unknown(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
+		raise TypeError("unknown tag " + data[pos - 1:pos].hex())
+	def parse_false(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 00
-		return b"false"
-	def parse_true(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (b"false", pos)
+	def parse_true(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 01
-		return b"true"
-	def parse_int8(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (b"true", pos)
+	def parse_int8(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 08
-		return repr(unpack("b", fp.read(1))[0]).encode()
-	def parse_zero(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(int8.unpack_from(data, pos)[0]).encode(), pos + 1)
+	def parse_zero(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 09, 0b, 11, 13, 21, 27, 41, 47
-		return b"0"
-	def parse_uint8(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (b"0", pos)
+	def parse_uint8(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 0a
-		return repr(fp.read(1)[0]).encode()
-	def parse_int16(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(data[pos]).encode(), pos + 1)
+	def parse_int16(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 10
-		return repr(unpack("<h", fp.read(2))[0]).encode()
-	def parse_uint16(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(int16.unpack_from(data, pos)[0]).encode(), pos + 2)
+	def parse_uint16(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 12
-		return repr(unpack("<H", fp.read(2))[0]).encode()
-	def parse_int32(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(uint16.unpack_from(data, pos)[0]).encode(), pos + 2)
+	def parse_int32(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 20
-		return repr(unpack("<i", fp.read(4))[0]).encode()
-	def parse_float32(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(int32.unpack_from(data, pos)[0]).encode(), pos + 4)
+	def parse_float32(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 22
-		return repr(unpack("<f", fp.read(4))[0]).replace("inf", "Infinity").replace("nan", "NaN").encode()
-	def parse_zero_point_zero(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(float32.unpack_from(data, pos)[0]).replace("inf", "Infinity").replace("nan", "NaN").encode(), pos + 4)
+	def parse_zero_point_zero(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 23, 43
-		return b"0.0"
-	def parse_uvarint(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (b"0.0", pos)
+	def parse_uvarint(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 24, 28, 44 and 48
-		return repr(self.parse_number(fp)).encode()
-	def parse_varint(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		num, pos = self.parse_number(data, pos)
+		return (repr(num).encode(), pos)
+	def parse_varint(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 25, 29, 45 and 49
-		num = self.parse_number(fp)
+		num, pos = self.parse_number(data, pos)
 		if num % 2:
 			num = -num - 1
-		return repr(num // 2).encode()
-	def parse_uint32(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(num // 2).encode(), pos)
+	def parse_uint32(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 26
-		return repr(unpack("<I", fp.read(4))[0]).encode()
-	def parse_int64(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(uint32.unpack_from(data, pos)[0]).encode(), pos + 4)
+	def parse_int64(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 40
-		return repr(unpack("<q", fp.read(8))[0]).encode()
-	def parse_float64(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(int64.unpack_from(data, pos)[0]).encode(), pos + 8)
+	def parse_float64(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 42
-		return repr(unpack("<d", fp.read(8))[0]).replace("inf", "Infinity").replace("nan", "NaN").encode()
-	def parse_uint64(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(float64.unpack_from(data, pos)[0]).replace("inf", "Infinity").replace("nan", "NaN").encode(), pos + 8)
+	def parse_uint64(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 46
-		return repr(unpack("<Q", fp.read(8))[0]).encode()
-	def parse_str(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (repr(uint64.unpack_from(data, pos)[0]).encode(), pos + 8)
+	def parse_str(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# types 81
-		return dumps(self.parse_text(fp), ensure_ascii = self.ensureAscii).encode()
-	def parse_printable_str(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		string, pos = self.parse_text(data, pos)
+		return (self.encode_string(string).encode(), pos)
+	def parse_printable_str(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 82
-		return dumps(self.parse_utf8_text(fp), ensure_ascii = self.ensureAscii).encode()
-	def parse_rtid(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		string, pos = self.parse_utf8_text(data, pos)
+		return (self.encode_string(string).encode(), pos)
+	def parse_rtid(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 83
-		return self.rtid_mappings[b"\x83" + fp.read(1)](self, fp)
-	def parse_rtid_zero(self, fp):
-	# type 8300
-		return b'"RTID(0)"'
-	def parse_rtid_uid(self, fp):
-	# type 8302
-		p1 = self.parse_utf8_text(fp)
-		i2 = repr(self.parse_number(fp))
-		i1 = repr(self.parse_number(fp))
-		return dumps("RTID(" + i1 + "." + i2 + "." + fp.read(4)[::-1].hex() + "@" + p1 + ")", ensure_ascii = self.ensureAscii).encode()
-	def parse_rtid_ref(self, fp):
-	# type 8303
-		p1 = self.parse_utf8_text(fp)
-		return dumps("RTID(" + self.parse_utf8_text(fp) + "@" + p1 + ")", ensure_ascii = self.ensureAscii).encode()
-	def parse_zero_ref(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		rtid, pos = self.rtid_loaders[data[pos]](self, data, pos + 1)
+		return (self.encode_string(rtid).encode(), pos)
+	def parse_zero_ref(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 84
-		return b'"RTID(0)"'
+		return (b'"RTID(0)"', pos)
 	def parse_root_object(self, fp):
 	# type 85*
-		VERSION = unpack("<I", fp.read(4))[0]
-		return self.parse_object(fp, self.currrent_indent, [], [])
-	def parse_object(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		items = []
+		self.write_root_object(fp, items.append)
+		return b"".join(items)
+	def parse_root_data(self, data, pos = 4, name = None):
+	# Decode a buffer, pos points to the version after the RTON header
+		items = []
+		self.write_root_data(items.append, data, pos, name)
+		return b"".join(items)
+	def parse_object(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 85
+		items = []
+		pos = self.write_object(data, pos, items.append, b"", currrent_indent, cached_strings, cached_printable_strings)
+		return (b"".join(items), pos)
+	def parse_list(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
+	# type 86
+		items = []
+		pos = self.write_list(data, pos, items.append, b"", currrent_indent, cached_strings, cached_printable_strings)
+		return (b"".join(items), pos)
+	def write_root_object(self, fp, write):
+	# Stream the JSON to write as it's decoded
+		pos = fp.tell()
+		fp.seek(0)
+		self.write_root_data(write, fp.read(), pos, fp.name)
+	def write_root_data(self, write, data, pos = 4, name = None):
+	# Stream the JSON of a buffer to write as it's decoded
+		self.name = str(name)
+		VERSION = uint32.unpack_from(data, pos)[0]
+		self.write_nested(data, pos + 4, 0x85, write, b"", self.currrent_indent, [], [])
+	def write_value(self, data, pos, write, prefix, currrent_indent, cached_strings, cached_printable_strings):
+	# Containers write themselves, prefix is written before the value
+		code = data[pos]
+		if code == 0x85:
+			return self.write_object(data, pos + 1, write, prefix, currrent_indent, cached_strings, cached_printable_strings)
+		elif code == 0x86:
+			return self.write_list(data, pos + 1, write, prefix, currrent_indent, cached_strings, cached_printable_strings)
+		value, pos = self.value_mappings[code](self, data, pos + 1, currrent_indent, cached_strings, cached_printable_strings)
+		write(prefix + value)
+		return pos
+	def write_object(self, data, pos, write, prefix, currrent_indent, cached_strings, cached_printable_strings):
+	# type 85, only sorted objects are buffered
+		key_mappings = self.key_mappings
+		write_value = self.write_value
+		doublePoint = self.doublePoint
 		new_indent = currrent_indent + self.indent
+		comma = self.comma + new_indent
+		separator = prefix + b"{" + new_indent
 		items = []
 		try:
-			code = fp.read(1)
-			while code != b"\xff":
-				key = self.key_mappings[code](self, fp, new_indent, cached_strings, cached_printable_strings)
-				value = self.value_mappings[fp.read(1)](self, fp, new_indent, cached_strings, cached_printable_strings)
-				items.append(key + self.doublePoint + value)
-				code = fp.read(1)
-		except KeyError as k:
-			if str(k) == 'b""':
-				if self.repairFiles:
-					self.warning_message("SilentError: " + fp.name + " pos " + str(fp.tell()) + ": end of file")
+			code = data[pos]
+			while code != 0xff:
+				key, pos = key_mappings[code](self, data, pos + 1, new_indent, cached_strings, cached_printable_strings)
+				if self.sortKeys:
+					item = []
+					pos = write_value(data, pos, item.append, key + doublePoint, new_indent, cached_strings, cached_printable_strings)
+					items.append(b"".join(item))
 				else:
-					raise EOFError
-			else:
-				raise TypeError("unknown tag " + k.args[0].hex())
+					pos = write_value(data, pos, write, separator + key + doublePoint, new_indent, cached_strings, cached_printable_strings)
+					separator = comma
+				code = data[pos]
+			pos += 1
 		except (error, IndexError):
-			if self.repairFiles:
-				self.warning_message("SilentError: " + fp.name + " pos " + str(fp.tell()) + ": end of file")
-			else:
-				raise EOFError
-		i2 = len(items)
-		if i2 != 0:
-			if self.sortKeys:
-				items = sorted(items)
-			return b"{" + new_indent + (self.comma + new_indent).join(items) + currrent_indent + b"}"
-		return b"{}"
-	def parse_list(self, fp, currrent_indent, cached_strings, cached_printable_strings):
-	# type 86
-		self.list_mappings[b"\x86" + fp.read(1)]
+			pos = self.end_of_file(data)
+		if items:
+			write(prefix + b"{" + new_indent + comma.join(sorted(items)) + currrent_indent + b"}")
+		elif separator is comma:
+			write(currrent_indent + b"}")
+		else:
+			write(prefix + b"{}")
+		return pos
+	def write_list(self, data, pos, write, prefix, currrent_indent, cached_strings, cached_printable_strings):
+	# type 86, only sorted lists are buffered
+		if data[pos] != 0xfd:
+			raise TypeError("unknown tag 86" + data[pos:pos + 1].hex())
+		write_value = self.write_value
 		new_indent = currrent_indent + self.indent
+		comma = self.comma + new_indent
+		separator = prefix + b"[" + new_indent
 		items = []
-		i1 = self.parse_number(fp)
+		i1, pos = self.parse_number(data, pos + 1)
+		i2 = 0
 		try:
-			code = fp.read(1)
-			while code != b"\xfe":
-				value = self.value_mappings[code](self, fp, new_indent, cached_strings, cached_printable_strings)
-				items.append(value)
-				code = fp.read(1)
-		except KeyError as k:
-			if str(k) == 'b""':
-				if self.repairFiles:
-					self.warning_message("SilentError: " + fp.name + " pos " + str(fp.tell()) + ": end of file")
+			code = data[pos]
+			while code != 0xfe:
+				if self.sortValues:
+					item = []
+					pos = write_value(data, pos, item.append, b"", new_indent, cached_strings, cached_printable_strings)
+					items.append(b"".join(item))
 				else:
-					raise EOFError
-			else:
-				raise TypeError("unknown tag " + k.args[0].hex())
+					pos = write_value(data, pos, write, separator, new_indent, cached_strings, cached_printable_strings)
+					separator = comma
+				i2 += 1
+				code = data[pos]
+			pos += 1
 		except (error, IndexError):
-			if self.repairFiles:
-				self.warning_message("SilentError: " + fp.name + " pos " + str(fp.tell()) + ": end of file")
-			else:
-				raise EOFError
-		i2 = len(items)
-		if i1 != i2:
-			self.warning_message("SilentError: " + fp.name + " pos " + str(fp.tell()) + ": Array of length " + str(i1) + " found, expected " + str(i2))
-		if i2 != 0:
-			if self.sortValues:
-				items = sorted(sorted(items), key = lambda key : len(key))
-			return b"[" + new_indent + (self.comma + new_indent).join(items) + currrent_indent + b"]"
-		return b"[]"
-	def parse_cached_str(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+			pos = self.end_of_file(data)
+		self.check_length(pos, i1, i2)
+		if items:
+			write(prefix + b"[" + new_indent + comma.join(sorted(sorted(items), key = lambda key : len(key))) + currrent_indent + b"]")
+		elif i2 != 0:
+			write(currrent_indent + b"]")
+		else:
+			write(prefix + b"[]")
+		return pos
+	def write_nested(self, data, pos, code, write, prefix, currrent_indent, cached_strings, cached_printable_strings):
+	# type 85, 86 without recursion, the containers of the current item wait on a stack
+		key_mappings = self.key_mappings
+		value_mappings = self.value_mappings
+		doublePoint = self.doublePoint
+		indent = self.indent
+		stack = []
+		# State of the caller, restored when the outer container is closed
+		is_object = None
+		end = None
+		new_indent = currrent_indent
+		comma = separator = items = item = None
+		i1 = i2 = 0
+		value_write = write
+		value_prefix = prefix
+		while True:
+			closing = False
+			try:
+				if code == 0x85 or code == 0x86:
+					if code == 0x86:
+						if data[pos] != 0xfd:
+							raise TypeError("unknown tag 86" + data[pos:pos + 1].hex())
+						count, pos = self.parse_number(data, pos + 1)
+						sort = self.sortValues
+					else:
+						count = 0
+						sort = self.sortKeys
+					stack.append((is_object, end, write, currrent_indent, new_indent, comma, separator, items, item, i1, i2))
+					is_object = code == 0x85
+					write = value_write
+					# The prefix is written now so the stack doesn't hold the prefixes of all parents
+					if value_prefix:
+						write(value_prefix)
+					currrent_indent = new_indent
+					new_indent = currrent_indent + indent
+					comma = self.comma + new_indent
+					if is_object:
+						end = 0xff
+						separator = b"{" + new_indent
+					else:
+						end = 0xfe
+						separator = b"[" + new_indent
+					if sort:
+						items = []
+					else:
+						items = None
+					i1 = count
+					i2 = 0
+				code = data[pos]
+				if code == end:
+					pos += 1
+					closing = True
+				else:
+					if is_object:
+						key, pos = key_mappings[code](self, data, pos + 1, new_indent, cached_strings, cached_printable_strings)
+						item_prefix = key + doublePoint
+						code = data[pos]
+					else:
+						item_prefix = b""
+					pos += 1
+					if items is None:
+						value_write = write
+						value_prefix = separator + item_prefix
+					else:
+						item = []
+						value_write = item.append
+						value_prefix = item_prefix
+					if code != 0x85 and code != 0x86:
+						value, pos = value_mappings[code](self, data, pos, new_indent, cached_strings, cached_printable_strings)
+						value_write(value_prefix + value)
+						if items is None:
+							separator = comma
+						else:
+							items.append(b"".join(item))
+						i2 += 1
+			except (error, IndexError):
+				if not stack:
+					raise
+				pos = self.end_of_file(data)
+				closing = True
+			if closing:
+				if is_object:
+					if items:
+						write(b"{" + new_indent + comma.join(sorted(items)) + currrent_indent + b"}")
+					elif i2 != 0:
+						write(currrent_indent + b"}")
+					else:
+						write(b"{}")
+				else:
+					self.check_length(pos, i1, i2)
+					if items:
+						write(b"[" + new_indent + comma.join(sorted(sorted(items), key = lambda key : len(key))) + currrent_indent + b"]")
+					elif i2 != 0:
+						write(currrent_indent + b"]")
+					else:
+						write(b"[]")
+				is_object, end, write, currrent_indent, new_indent, comma, separator, items, item, i1, i2 = stack.pop()
+				if not stack:
+					return pos
+				if items is None:
+					separator = comma
+				else:
+					items.append(b"".join(item))
+				i2 += 1
+				code = None
+	def parse_cached_str(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 90
-		value = dumps(self.parse_text(fp), ensure_ascii = self.ensureAscii).encode()
+		string, pos = self.parse_text(data, pos)
+		value = self.encode_string(string).encode()
 		cached_strings.append(value)
-		return value
-	def parse_cached_str_recall(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (value, pos)
+	def parse_cached_str_recall(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 91
-		return cached_strings[self.parse_number(fp)]
-	def parse_cached_printable_str(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		index, pos = self.parse_number(data, pos)
+		return (cached_strings[index], pos)
+	def parse_cached_printable_str(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 92
-		value = dumps(self.parse_utf8_text(fp), ensure_ascii = self.ensureAscii).encode()
+		string, pos = self.parse_utf8_text(data, pos)
+		value = self.encode_string(string).encode()
 		cached_printable_strings.append(value)
-		return value
-	def parse_cached_printable_str_recall(self, fp, currrent_indent, cached_strings, cached_printable_strings):
+		return (value, pos)
+	def parse_cached_printable_str_recall(self, data, pos, currrent_indent, cached_strings, cached_printable_strings):
 	# type 93
-		return cached_printable_strings[self.parse_number(fp)]
-	rtid_mappings = {
-		b"\x83\0": parse_rtid_zero,
-		b"\x83\x02": parse_rtid_uid,
-		b"\x83\x03": parse_rtid_ref
-	}
-	key_mappings = {
-		b"\x81": parse_str,
-		b"\x82": parse_printable_str,
-		
-		b"\x90": parse_cached_str,
-		b"\x91": parse_cached_str_recall,
-		b"\x92": parse_cached_printable_str,
-		b"\x93": parse_cached_printable_str_recall
-	}
-	value_mappings = {
-		b"\0": parse_false,
-		b"\x01": parse_true,
+		index, pos = self.parse_number(data, pos)
+		return (cached_printable_strings[index], pos)
 
-		b"\x08": parse_int8,
-		b"\t": parse_zero, # int8_zero
-		b"\n": parse_uint8,
-		b"\x0b": parse_zero, # uint8_zero
+	def load_unknown(self, data, pos, cached_strings, cached_printable_strings):
+		raise TypeError("unknown tag " + data[pos - 1:pos].hex())
+	def load_false(self, data, pos, cached_strings, cached_printable_strings):
+	# type 00
+		return (False, pos)
+	def load_true(self, data, pos, cached_strings, cached_printable_strings):
+	# type 01
+		return (True, pos)
+	def load_int8(self, data, pos, cached_strings, cached_printable_strings):
+	# type 08
+		return (int8.unpack_from(data, pos)[0], pos + 1)
+	def load_zero(self, data, pos, cached_strings, cached_printable_strings):
+	# type 09, 0b, 11, 13, 21, 27, 41, 47
+		return (0, pos)
+	def load_uint8(self, data, pos, cached_strings, cached_printable_strings):
+	# type 0a
+		return (data[pos], pos + 1)
+	def load_int16(self, data, pos, cached_strings, cached_printable_strings):
+	# type 10
+		return (int16.unpack_from(data, pos)[0], pos + 2)
+	def load_uint16(self, data, pos, cached_strings, cached_printable_strings):
+	# type 12
+		return (uint16.unpack_from(data, pos)[0], pos + 2)
+	def load_int32(self, data, pos, cached_strings, cached_printable_strings):
+	# type 20
+		return (int32.unpack_from(data, pos)[0], pos + 4)
+	def load_float32(self, data, pos, cached_strings, cached_printable_strings):
+	# type 22
+		return (float32.unpack_from(data, pos)[0], pos + 4)
+	def load_zero_point_zero(self, data, pos, cached_strings, cached_printable_strings):
+	# type 23, 43
+		return (0.0, pos)
+	def load_uvarint(self, data, pos, cached_strings, cached_printable_strings):
+	# type 24, 28, 44 and 48
+		return self.parse_number(data, pos)
+	def load_varint(self, data, pos, cached_strings, cached_printable_strings):
+	# type 25, 29, 45 and 49
+		num, pos = self.parse_number(data, pos)
+		if num % 2:
+			num = -num - 1
+		return (num // 2, pos)
+	def load_uint32(self, data, pos, cached_strings, cached_printable_strings):
+	# type 26
+		return (uint32.unpack_from(data, pos)[0], pos + 4)
+	def load_int64(self, data, pos, cached_strings, cached_printable_strings):
+	# type 40
+		return (int64.unpack_from(data, pos)[0], pos + 8)
+	def load_float64(self, data, pos, cached_strings, cached_printable_strings):
+	# type 42
+		return (float64.unpack_from(data, pos)[0], pos + 8)
+	def load_uint64(self, data, pos, cached_strings, cached_printable_strings):
+	# type 46
+		return (uint64.unpack_from(data, pos)[0], pos + 8)
+	def load_str(self, data, pos, cached_strings, cached_printable_strings):
+	# types 81
+		return self.parse_text(data, pos)
+	def load_printable_str(self, data, pos, cached_strings, cached_printable_strings):
+	# type 82
+		return self.parse_utf8_text(data, pos)
+	def load_rtid(self, data, pos, cached_strings, cached_printable_strings):
+	# type 83
+		return self.rtid_loaders[data[pos]](self, data, pos + 1)
+	def load_rtid_unknown(self, data, pos):
+		raise TypeError("unknown tag 83" + data[pos - 1:pos].hex())
+	def load_rtid_zero(self, data, pos):
+	# type 8300
+		return (RTID("RTID(0)"), pos)
+	def load_rtid_uid(self, data, pos):
+	# type 8302
+		p1, pos = self.parse_utf8_text(data, pos)
+		i2, pos = self.parse_number(data, pos)
+		i1, pos = self.parse_number(data, pos)
+		return (RTID("RTID(" + repr(i1) + "." + repr(i2) + "." + bytes(data[pos:pos + 4])[::-1].hex() + "@" + p1 + ")"), pos + 4)
+	def load_rtid_ref(self, data, pos):
+	# type 8303
+		p1, pos = self.parse_utf8_text(data, pos)
+		p2, pos = self.parse_utf8_text(data, pos)
+		return (RTID("RTID(" + p2 + "@" + p1 + ")"), pos)
+	def load_zero_ref(self, data, pos, cached_strings, cached_printable_strings):
+	# type 84
+		return (RTID("RTID(0)"), pos)
+	def load_root_object(self, fp):
+	# type 85*
+		pos = fp.tell()
+		fp.seek(0)
+		return self.load_root_data(fp.read(), pos, fp.name)
+	def load_root_data(self, data, pos = 4, name = None):
+	# Load a buffer as Python objects, pos points to the version after the RTON header
+		self.name = str(name)
+		VERSION = uint32.unpack_from(data, pos)[0]
+		return self.load_object(data, pos + 4, [], [])[0]
+	def load_object(self, data, pos, cached_strings, cached_printable_strings):
+	# type 85
+		key_loaders = self.key_loaders
+		value_loaders = self.value_loaders
+		items = []
+		try:
+			code = data[pos]
+			while code != 0xff:
+				key, pos = key_loaders[code](self, data, pos + 1, cached_strings, cached_printable_strings)
+				value, pos = value_loaders[data[pos]](self, data, pos + 1, cached_strings, cached_printable_strings)
+				items.append((key, value))
+				code = data[pos]
+			pos += 1
+		except (error, IndexError):
+			pos = self.end_of_file(data)
+		return (self.object_pairs_hook(items), pos)
+	def load_list(self, data, pos, cached_strings, cached_printable_strings):
+	# type 86
+		if data[pos] != 0xfd:
+			raise TypeError("unknown tag 86" + data[pos:pos + 1].hex())
+		value_loaders = self.value_loaders
+		items = []
+		i1, pos = self.parse_number(data, pos + 1)
+		try:
+			code = data[pos]
+			while code != 0xfe:
+				value, pos = value_loaders[code](self, data, pos + 1, cached_strings, cached_printable_strings)
+				items.append(value)
+				code = data[pos]
+			pos += 1
+		except (error, IndexError):
+			pos = self.end_of_file(data)
+		self.check_length(pos, i1, len(items))
+		return (items, pos)
+	def load_cached_str(self, data, pos, cached_strings, cached_printable_strings):
+	# type 90
+		value, pos = self.parse_text(data, pos)
+		cached_strings.append(value)
+		return (value, pos)
+	def load_cached_str_recall(self, data, pos, cached_strings, cached_printable_strings):
+	# type 91
+		index, pos = self.parse_number(data, pos)
+		return (cached_strings[index], pos)
+	def load_cached_printable_str(self, data, pos, cached_strings, cached_printable_strings):
+	# type 92
+		value, pos = self.parse_utf8_text(data, pos)
+		cached_printable_strings.append(value)
+		return (value, pos)
+	def load_cached_printable_str_recall(self, data, pos, cached_strings, cached_printable_strings):
+	# type 93
+		index, pos = self.parse_number(data, pos)
+		return (cached_printable_strings[index], pos)
+
+	# Tag tables, the first column decodes to JSON, the second to Python objects
+	rtid_loaders, = dispatch_tables({
+		0x00: (load_rtid_zero,),
+		0x02: (load_rtid_uid,),
+		0x03: (load_rtid_ref,)
+	}, (load_rtid_unknown,))
+	key_mappings, key_loaders = dispatch_tables({
+		0x81: (parse_str, load_str),
+		0x82: (parse_printable_str, load_printable_str),
+		
+		0x90: (parse_cached_str, load_cached_str),
+		0x91: (parse_cached_str_recall, load_cached_str_recall),
+		0x92: (parse_cached_printable_str, load_cached_printable_str),
+		0x93: (parse_cached_printable_str_recall, load_cached_printable_str_recall)
+	}, (parse_unknown, load_unknown))
+	value_mappings, value_loaders = dispatch_tables({
+		0x00: (parse_false, load_false),
+		0x01: (parse_true, load_true),
 
-		b"\x10": parse_int16,
-		b"\x11": parse_zero, # int16_zero
-		b"\x12": parse_uint16,
-		b"\x13": parse_zero, # uint16_zero
+		0x08: (parse_int8, load_int8),
+		0x09: (parse_zero, load_zero), # int8_zero
+		0x0a: (parse_uint8, load_uint8),
+		0x0b: (parse_zero, load_zero), # uint8_zero
 
-		b" ": parse_int32,
-		b"!": parse_zero, # int32_zero
-		b'"': parse_float32,
-		b"#": parse_zero_point_zero, # float_zero
-		b"$": parse_uvarint, # int32_uvarint
-		b"%": parse_varint, # int32_varint
-		b"&": parse_uint32,
-		b"'": parse_zero, #uint_32_zero
-		b"(": parse_uvarint, # uint32_uvarint
+		0x10: (parse_int16, load_int16),
+		0x11: (parse_zero, load_zero), # int16_zero
+		0x12: (parse_uint16, load_uint16),
+		0x13: (parse_zero, load_zero), # uint16_zero
 
-		b"@": parse_int64,
-		b"A": parse_zero, #int64_zero
-		b"B": parse_float64,
-		b"C": parse_zero_point_zero, # double_zero
-		b"D": parse_uvarint, # int64_uvarint
-		b"E": parse_varint, # int64_varint
-		b"F": parse_uint64,
-		b"G": parse_zero, # uint64_zero
-		b"H": parse_uvarint, # uint64_uvarint
+		0x20: (parse_int32, load_int32),
+		0x21: (parse_zero, load_zero), # int32_zero
+		0x22: (parse_float32, load_float32),
+		0x23: (parse_zero_point_zero, load_zero_point_zero), # float_zero
+		0x24: (parse_uvarint, load_uvarint), # int32_uvarint
+		0x25: (parse_varint, load_varint), # int32_varint
+		0x26: (parse_uint32, load_uint32),
+		0x27: (parse_zero, load_zero), #uint_32_zero
+		0x28: (parse_uvarint, load_uvarint), # uint32_uvarint
 
-		b"\x81": parse_str,
-		b"\x82": parse_printable_str,
-		b"\x83": parse_rtid,
-		b"\x84": parse_zero_ref,
-		b"\x85": parse_object,
-		b"\x86": parse_list,
+		0x40: (parse_int64, load_int64),
+		0x41: (parse_zero, load_zero), #int64_zero
+		0x42: (parse_float64, load_float64),
+		0x43: (parse_zero_point_zero, load_zero_point_zero), # double_zero
+		0x44: (parse_uvarint, load_uvarint), # int64_uvarint
+		0x45: (parse_varint, load_varint), # int64_varint
+		0x46: (parse_uint64, load_uint64),
+		0x47: (parse_zero, load_zero), # uint64_zero
+		0x48: (parse_uvarint, load_uvarint), # uint64_uvarint
 
-		b"\x90": parse_cached_str,
-		b"\x91": parse_cached_str_recall,
-		b"\x92": parse_cached_printable_str,
-		b"\x93": parse_cached_printable_str_recall,
-	}
-	list_mappings = {
-		b"\x86\xfd": None
-	}
+		0x81: (parse_str, load_str),
+		0x82: (parse_printable_str, load_printable_str),
+		0x83: (parse_rtid, load_rtid),
+		0x84: (parse_zero_ref, load_zero_ref),
+		0x85: (parse_object, load_object),
+		0x86: (parse_list, load_list),
 
-class list2:
-# Extra list class
-	def __init__(self, data):
-		self.data = data
+		0x90: (parse_cached_str, load_cached_str),
+		0x91: (parse_cached_str_recall, load_cached_str_recall),
+		0x92: (parse_cached_printable_str, load_cached_printable_str),
+		0x93: (parse_cached_printable_str_recall, load_cached_printable_str_recall)
+	}, (parse_unknown, load_unknown))
 
 class JSONDecoder():
 	def __init__(self):
@@ -273,155 +612,331 @@ class JSONDecoder():
 	def encode_object_pairs(self, pairs):
 	# Object to list of tuples
 		return list2(pairs)
-	def encode_number(self, integ):
+	def write_number(self, data, integ):
 	# Number with variable length
-		integ, i = divmod(integ, 128)
-		if (integ):
-			i += 128
-		string = pack("B", i)
-		while integ:
-			integ, i = divmod(integ, 128)
-			if (integ):
-				i += 128
-			string += pack("B", i)
-		return string
-	def encode_utf8_text(self, string):
+		while integ > 127:
+			data.append(integ & 0x7f | 0x80)
+			integ >>= 7
+		data.append(integ)
+	def write_utf8_text(self, data, string):
 	# unicode text in rtid
 		encoded_string = string.encode()
-		return self.encode_number(len(string)) + self.encode_number(len(encoded_string)) + encoded_string
+		self.write_number(data, len(string))
+		self.write_number(data, len(encoded_string))
+		data += encoded_string
 
-	def encode_bool(self, boolean):
+	def write_null(self, data, value, cached_strings):
+	# type 84
+		data.append(0x84)
+	def write_bool(self, data, boolean, cached_strings):
 	# type 00, 01
 		if boolean:
-			return b"\x01"
+			data.append(0x01)
 		else:
-			return b"\x00"
-	def encode_int(self, integ):
+			data.append(0x00)
+	def write_int(self, data, integ, cached_strings):
 	# type 08, 0a, 10, 12, 20, 21, 25, 26, 29, 40, 45, 46, 49
 		if integ == 0:
-			return b"!"
+			data.append(0x21)
 		elif 0 <= integ <= 2097151:
-			return b"$" + self.encode_number(integ)
+			data.append(0x24)
+			self.write_number(data, integ)
 		elif -1048576 <= integ <= 0:
-			return b"%" + self.encode_number(-1 - 2 * integ)
+			data.append(0x25)
+			self.write_number(data, -1 - 2 * integ)
 		elif -2147483648 <= integ <= 2147483647:
-			return b" " + pack("<i", integ)
+			data += b" " + int32.pack(integ)
 		elif 0 <= integ < 4294967295:
-			return b"&" + pack("<I", integ)
+			data += b"&" + uint32.pack(integ)
 		elif 0 <= integ <= 562949953421311:
-			return b"D" + self.encode_number(integ)
+			data.append(0x44)
+			self.write_number(data, integ)
 		elif -281474976710656 <= integ <= 0:
-			return b"E" + self.encode_number(-1 - 2 * integ)
+			data.append(0x45)
+			self.write_number(data, -1 - 2 * integ)
 		elif -9223372036854775808 <= integ <= 9223372036854775807:
-			return b"@" + pack("<q", integ)
+			data += b"@" + int64.pack(integ)
 		elif 0 <= integ <= 18446744073709551615:
-			return b"F" + pack("<Q", integ)
+			data += b"F" + uint64.pack(integ)
 		elif 0 <= integ:
-			return b"D" + self.encode_number(integ)
+			data.append(0x44)
+			self.write_number(data, integ)
 		else:
-			return b"E" + self.encode_number(-1 - 2 * integ)
-	def encode_float(self, dec):
+			data.append(0x45)
+			self.write_number(data, -1 - 2 * integ)
+	def write_float(self, data, dec, cached_strings):
 	# type 22, 42
 		if dec == 0:
-			return b"#"
-		elif dec != dec or dec in self.Infinity or -340282346638528859811704183484516925440 <= dec <= 340282346638528859811704183484516925440 and dec == unpack("<f", pack("<f", dec))[0]:
-			return b'"' + pack("<f", dec)
+			data.append(0x23)
+		elif dec != dec or dec in self.Infinity or -340282346638528859811704183484516925440 <= dec <= 340282346638528859811704183484516925440 and dec == float32.unpack(float32.pack(dec))[0]:
+			data += b'"' + float32.pack(dec)
+		else:
+			data += b"B" + float64.pack(dec)
+	def write_string(self, data, string, cached_strings):
+	# type 83, 84, 90, 91
+		if "RTID()" == string[:5] + string[-1:]:
+			self.write_rtid(data, string)
 		else:
-			return b"B" + pack("<d", dec)
-	def encode_rtid(self, string):
+			self.write_cached_string(data, string, cached_strings)
+	def write_rtid(self, data, string):
 	# type 83
 		if "@" in string:
 			name, type = string[5:-1].split("@")
 			if name.count(".") == 2:
 				i2, i1, i3 = name.split(".")
-				return b"\x83\x02" + self.encode_utf8_text(type) + self.encode_number(int(i1)) + self.encode_number(int(i2)) + bytes.fromhex(i3)[::-1]
+				data += b"\x83\x02"
+				self.write_utf8_text(data, type)
+				self.write_number(data, int(i1))
+				self.write_number(data, int(i2))
+				data += bytes.fromhex(i3)[::-1]
 			else:
-				return b"\x83\x03" + self.encode_utf8_text(type) + self.encode_utf8_text(name)
+				data += b"\x83\x03"
+				self.write_utf8_text(data, type)
+				self.write_utf8_text(data, name)
 		else:
-			return b"\x84"
-	def encode_root_object(self, file):
-	# type 85*
-		cached_strings = {}
-		items = []
-		for key, value in load(file, object_pairs_hook = self.encode_object_pairs).data:
-			key = self.encode_cached_string(key, cached_strings)
-			if isinstance(value, str):
-				if "RTID()" == value[:5] + value[-1:]:
-					value = self.encode_rtid(value)
-				else:
-					value = self.encode_cached_string(value, cached_strings)
-			elif isinstance(value, bool):
-				value = self.encode_bool(value)
-			elif isinstance(value, int):
-				value = self.encode_int(value)
-			elif isinstance(value, float):
-				value = self.encode_float(value)
-			elif isinstance(value, list):
-				value = self.encode_array(value, cached_strings)
-			elif isinstance(value, list2):
-				value = self.encode_object(value, cached_strings)
-			elif value == None:
-				value = b"\x84"
-			else:
-				raise TypeError(type(value))
-			items.append(key + value)
-		return b"RTON\x01\0\0\0" + b"".join(items) + b"\xffDONE"
-	def encode_object(self, data, cached_strings):
-	# type 85
-		items = []
-		for key, value in data.data:
-			key = self.encode_cached_string(key, cached_strings)
-			if isinstance(value, str):
-				if "RTID()" == value[:5] + value[-1:]:
-					value = self.encode_rtid(value)
-				else:
-					value = self.encode_cached_string(value, cached_strings)
-			elif isinstance(value, bool):
-				value = self.encode_bool(value)
-			elif isinstance(value, int):
-				value = self.encode_int(value)
-			elif isinstance(value, float):
-				value = self.encode_float(value)
-			elif isinstance(value, list):
-				value = self.encode_array(value, cached_strings)
-			elif isinstance(value, list2):
-				value = self.encode_object(value, cached_strings)
-			elif value == None:
-				value = b"\x84"
-			else:
-				raise TypeError(type(value))
-			items.append(key + value)
-		return b"\x85" + b"".join(items) + b"\xff"
-	def encode_array(self, data, cached_strings):
-	# type 86
-		items = []
-		for value in data:
-			if isinstance(value, str):
-				if "RTID()" == value[:5] + value[-1:]:
-					value = self.encode_rtid(value)
-				else:
-					value = self.encode_cached_string(value, cached_strings)
-			elif isinstance(value, bool):
-				value = self.encode_bool(value)
-			elif isinstance(value, int):
-				value = self.encode_int(value)
-			elif isinstance(value, float):
-				value = self.encode_float(value)
-			elif isinstance(value, list):
-				value = self.encode_array(value, cached_strings)
-			elif isinstance(value, list2):
-				value = self.encode_object(value, cached_strings)
-			elif value == None:
-				value = b"\x84"
-			else:
-				raise TypeError(type(value))
-			items.append(value)
-		return b"\x86\xfd" + self.encode_number(len(data)) + b"".join(items) + b"\xfe"
-	def encode_cached_string(self, string, cached_strings):
+			data.append(0x84)
+	def write_cached_string(self, data, string, cached_strings):
 	# type 90, 91
 		if string in cached_strings:
-			return b"\x91" + self.encode_number(cached_strings[string])
+			data.append(0x91)
+			self.write_number(data, cached_strings[string])
 		else:
 			cached_strings[string] = len(cached_strings)
 			encoded_string = string.encode()
-			return b"\x90" + self.encode_number(len(encoded_string)) + encoded_string
\ No newline at end of file
+			data.append(0x90)
+			self.write_number(data, len(encoded_string))
+			data += encoded_string
+	def write_items(self, data, items, cached_strings):
+	# Keys and values of an object
+		value_encoders = self.value_encoders
+		write_other = type(self).write_other
+		write_cached_string = self.write_cached_string
+		for key, value in items:
+			write_cached_string(data, key, cached_strings)
+			value_encoders.get(type(value), write_other)(self, data, value, cached_strings)
+	def write_object(self, data, value, cached_strings):
+	# type 85
+		data.append(0x85)
+		self.write_items(data, value.data, cached_strings)
+		data.append(0xff)
+	def write_array(self, data, values, cached_strings):
+	# type 86
+		value_encoders = self.value_encoders
+		write_other = type(self).write_other
+		data += b"\x86\xfd"
+		self.write_number(data, len(values))
+		for value in values:
+			value_encoders.get(type(value), write_other)(self, data, value, cached_strings)
+		data.append(0xfe)
+	def write_dict(self, data, value, cached_strings):
+	# type 85 from a dict
+		data.append(0x85)
+		self.write_items(data, value.items(), cached_strings)
+		data.append(0xff)
+	def write_rtid_value(self, data, rtid, cached_strings):
+	# type 83, 84 from an RTID
+		self.write_rtid(data, rtid)
+	def write_other(self, data, value, cached_strings):
+	# Value of a subclass or another number type, encoded like the type it extends
+		if isinstance(value, RTID):
+			self.write_rtid(data, value)
+		elif isinstance(value, str):
+			self.write_string(data, value, cached_strings)
+		elif isinstance(value, dict):
+			self.write_dict(data, value, cached_strings)
+		elif isinstance(value, list2):
+			self.write_object(data, value, cached_strings)
+		elif isinstance(value, (list, tuple)):
+			self.write_array(data, value, cached_strings)
+		elif isinstance(value, Integral):
+			self.write_int(data, int(value), cached_strings)
+		elif isinstance(value, Real):
+			self.write_float(data, float(value), cached_strings)
+		else:
+			raise TypeError(type(value))
+	def encode_root_data(self, root):
+	# type 85*, root is a dict, a list2 or a list of key value pairs, use list2 for nested objects with duplicate keys
+		if isinstance(root, dict):
+			items = root.items()
+		elif isinstance(root, list2):
+			items = root.data
+		else:
+			items = root
+		data = bytearray(b"RTON\x01\0\0\0")
+		self.write_items(data, items, {})
+		data += b"\xffDONE"
+		return bytes(data)
+	def encode_root_object(self, file):
+	# type 85*
+		return self.encode_root_data(load(file, object_pairs_hook = self.encode_object_pairs))
+	def write_root_object(self, fp, write, chunk_size = 65536):
+	# type 85*, tokenize the JSON of fp and write the RTON as it's encoded, only arrays are buffered until their length is known
+		value_encoders = self.value_encoders
+		write_other = type(self).write_other
+		write_cached_string = self.write_cached_string
+		match_whitespace = json_whitespace.match
+		match_number = json_number.match
+		chunk = fp.read(chunk_size)
+		eof = not chunk
+		if isinstance(chunk, str):
+			decode = None
+			text = chunk
+		else:
+			# The encoding is detected from the first 4 bytes
+			while not eof and len(chunk) < 4:
+				more = fp.read(chunk_size)
+				eof = not more
+				chunk += more
+			decode = getincrementaldecoder(detect_encoding(chunk))("surrogatepass").decode
+			text = decode(chunk, eof)
+		pos = 0
+		data = bytearray(b"RTON\x01\0\0\0")
+		cached_strings = {}
+		# Parents of the current container: is_object, target, count
+		stack = []
+		is_object = True
+		target = data
+		count = 0
+		arrays = 0
+		expect = JSON_ROOT
+		while True:
+			pos = match_whitespace(text, pos).end()
+			if pos == len(text):
+				if eof:
+					if expect != JSON_DONE:
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					break
+				more = True
+			else:
+				more = False
+				char = text[pos]
+				if expect == JSON_DONE:
+					raise JSONDecodeError("Extra data", text, pos)
+				elif char == '"':
+					try:
+						value, end = scanstring(text, pos + 1, True)
+					except JSONDecodeError as e:
+						if eof or not e.msg.startswith("Unterminated") and e.pos + 8 < len(text):
+							raise
+						more = True
+					else:
+						pos = end
+						if expect == JSON_KEY_OR_CLOSE or expect == JSON_KEY:
+							write_cached_string(target, value, cached_strings)
+							expect = JSON_COLON
+						elif expect == JSON_VALUE or expect == JSON_VALUE_OR_CLOSE:
+							value_encoders[str](self, target, value, cached_strings)
+							if not is_object:
+								count += 1
+							expect = JSON_COMMA_OR_CLOSE
+						else:
+							raise JSONDecodeError(json_expected[expect], text, pos)
+				elif char == ",":
+					if expect != JSON_COMMA_OR_CLOSE:
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					pos += 1
+					if is_object:
+						expect = JSON_KEY
+					else:
+						expect = JSON_VALUE
+				elif char == ":":
+					if expect != JSON_COLON:
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					pos += 1
+					expect = JSON_VALUE
+				elif char == "{":
+					if expect == JSON_ROOT:
+						expect = JSON_KEY_OR_CLOSE
+					elif expect == JSON_VALUE or expect == JSON_VALUE_OR_CLOSE:
+						target.append(0x85)
+						if not is_object:
+							count += 1
+						stack.append((is_object, target, count))
+						is_object = True
+						expect = JSON_KEY_OR_CLOSE
+					else:
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					pos += 1
+				elif char == "}":
+					if not (expect == JSON_KEY_OR_CLOSE or expect == JSON_COMMA_OR_CLOSE and is_object):
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					pos += 1
+					if stack:
+						target.append(0xff)
+						is_object, target, count = stack.pop()
+						expect = JSON_COMMA_OR_CLOSE
+					else:
+						data += b"\xffDONE"
+						expect = JSON_DONE
+				elif char == "[":
+					if not (expect == JSON_VALUE or expect == JSON_VALUE_OR_CLOSE):
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					pos += 1
+					if not is_object:
+						count += 1
+					stack.append((is_object, target, count))
+					is_object = False
+					target = bytearray()
+					count = 0
+					arrays += 1
+					expect = JSON_VALUE_OR_CLOSE
+				elif char == "]":
+					if not (expect == JSON_VALUE_OR_CLOSE or expect == JSON_COMMA_OR_CLOSE and not is_object):
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					pos += 1
+					items = target
+					length = count
+					is_object, target, count = stack.pop()
+					target += b"\x86\xfd"
+					self.write_number(target, length)
+					target += items
+					target.append(0xfe)
+					arrays -= 1
+					expect = JSON_COMMA_OR_CLOSE
+				else:
+					if not (expect == JSON_VALUE or expect == JSON_VALUE_OR_CLOSE):
+						raise JSONDecodeError(json_expected[expect], text, pos)
+					number = match_number(text, pos)
+					if number is not None and (eof or number.end() + 2 < len(text)):
+						integer, frac, exp = number.groups()
+						if frac or exp:
+							value = float(integer + (frac or "") + (exp or ""))
+						else:
+							value = int(integer)
+						pos = number.end()
+					elif number is None and char in json_constants and text.startswith(json_constants[char][0], pos):
+						constant, value = json_constants[char]
+						pos += len(constant)
+					elif eof or number is None and pos + 9 < len(text):
+						raise JSONDecodeError("Expecting value", text, pos)
+					else:
+						more = True
+					if not more:
+						value_encoders.get(type(value), write_other)(self, target, value, cached_strings)
+						if not is_object:
+							count += 1
+						expect = JSON_COMMA_OR_CLOSE
+			if more:
+				chunk = fp.read(chunk_size)
+				eof = not chunk
+				if decode is not None:
+					chunk = decode(chunk, eof)
+				text = text[pos:] + chunk
+				pos = 0
+			elif arrays == 0 and len(data) >= chunk_size:
+				write(bytes(data))
+				del data[:]
+		write(bytes(data))
+	# Encoders by the exact type of the value, bool is not handled as int, other types go to write_other
+	value_encoders = {
+		type(None): write_null,
+		bool: write_bool,
+		int: write_int,
+		float: write_float,
+		str: write_string,
+		RTID: write_rtid_value,
+		list: write_array,
+		tuple: write_array,
+		list2: write_object,
+		dict: write_dict
+	}
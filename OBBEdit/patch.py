@@ -1,16 +1,25 @@
 # Import libraries
 import datetime
+from contextlib import redirect_stdout
 from hashlib import md5
-from io import BytesIO
-from os import makedirs, listdir, getcwd, sep
+from io import StringIO
+from mmap import mmap, ACCESS_READ
+from multiprocessing import Pool, freeze_support
+from os import makedirs, listdir, getcwd, scandir, sep
 from os.path import isdir, isfile, join as osjoin, dirname, relpath, splitext
-#from PIL import Image
+try:
+	from PIL import Image
+except ImportError:
+	Image = None
 from struct import pack, unpack
+from time import perf_counter
 from zlib import compress, decompress
 
 # 3th party libraries
-from libraries.pyvz2nineteendo import LogError, blue_print, green_print, initialize, path_input, list_levels
+from libraries.pyvz2nineteendo import LogError, Stats, blue_print, compress_stream, decompress_bytearray, green_print, initialize, path_input, temp_output, list_levels
 from libraries.pyvz2rijndael import RijndaelCBC
+from libraries.pyvz2ptx import obb_ptx_encoders, ptx_textures, rsb_ptx_encoders
+from libraries.pyvz2rsb import RSBHeader, RSGHeader, SubgroupInfo, rsb_ptx_info, rsb_subgroup_offsets, rsg_file_list
 from libraries.pyvz2rton import JSONDecoder
 
 options = {
@@ -71,6 +80,8 @@ options = {
 	"rsgPatched": "",
 	"rsgUnpacked": "",
 	"rsgUnpackLevel": 7,
+	"slowestFiles": 10,
+	"workers": 1,
 	# Encryption options
 	"encryptedExtensions": (
 		".rton",
@@ -109,33 +120,38 @@ class SectionError(Exception):
 	pass
 def extend_to_4096(number):
 	return b"\0" * ((4096 - number) & 4095)
-def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
-# Patch RGSP file
-	HEADER = file.read(4)
-	VERSION = unpack("<I", file.read(4))[0]
-		
-	file.seek(8, 1)
-	COMPRESSION_FLAGS = unpack("<I", file.read(4))[0]
-	HEADER_LENGTH = unpack("<I", file.read(4))[0]
-
-	DATA_OFFSET = unpack("<I", file.read(4))[0]
-	COMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-	DECOMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-	
-	file.seek(4, 1)
-	IMAGE_DATA_OFFSET = unpack("<I", file.read(4))[0]
-	COMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-	DECOMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-	
-	file.seek(20, 1)
-	INFO_SIZE = unpack("<I", file.read(4))[0]
-	INFO_OFFSET = unpack("<I", file.read(4))[0]
-	INFO_LIMIT = INFO_OFFSET + INFO_SIZE
+def ptx_encoders(name, level):
+# PTX encoders for the textures of a RSB, ARGB8888 is ABGR8888 in OBBs
+	if level < 7 or Image is None:
+		return {}
+	elif name.lower().endswith(".obb"):
+		return obb_ptx_encoders
+	return rsb_ptx_encoders
+def ptx_encode(file_name, encoder, WIDTH, HEIGHT, PITCH):
+# Encode a PNG to a PTX
+	image = Image.open(file_name).convert("RGBA")
+	if image.size != (WIDTH, HEIGHT):
+		raise SectionError("Incompatible image size, found " + repr(image.size[0]) + "x" + repr(image.size[1]) + ", expected: " + repr(WIDTH) + "x" + repr(HEIGHT))
+	return encoder(image, WIDTH, HEIGHT, PITCH)
+def rsg_patch_data(RSG_NAME, pathout_data, textures, patch, patchout, level):
+# Patch RGSP file, textures are the encoder, width, height & pitch of its PTX entries
+	header = RSGHeader.unpack_from(pathout_data)
+	COMPRESSION_FLAGS = header.compression_flags
+	DATA_OFFSET = header.data_offset
+	COMPRESSED_DATA_SIZE = header.compressed_data_size
+	DECOMPRESSED_DATA_SIZE = header.decompressed_data_size
+	IMAGE_DATA_OFFSET = header.image_data_offset
+	COMPRESSED_IMAGE_DATA_SIZE = header.compressed_image_data_size
+	DECOMPRESSED_IMAGE_DATA_SIZE = header.decompressed_image_data_size
+	INFO_OFFSET = header.info_offset
+	INFO_LIMIT = INFO_OFFSET + header.info_size
 
 	data = None
 	if level < 5:
 		try:
+			start = perf_counter()
 			patch_data = open(osjoin(patch, RSG_NAME + ".section"), "rb").read()
+			stats.add("read", start, len(patch_data))
 			patch_length = len(patch_data)
 			if patch_length == DECOMPRESSED_DATA_SIZE:
 				data = patch_data
@@ -146,13 +162,17 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 	elif COMPRESSION_FLAGS & 2 == 0: # Decompressed files
 		data = bytearray(pathout_data[DATA_OFFSET: DATA_OFFSET + COMPRESSED_DATA_SIZE])
 	elif COMPRESSED_DATA_SIZE != 0: # Compressed files
+		start = perf_counter()
 		data = bytearray(decompress(pathout_data[DATA_OFFSET: DATA_OFFSET + COMPRESSED_DATA_SIZE]))
+		stats.add("decompress", start, COMPRESSED_DATA_SIZE, len(data))
 		
 	image_data = None
 	if DECOMPRESSED_IMAGE_DATA_SIZE != 0:
 		if level < 5:
 			try:
+				start = perf_counter()
 				patch_data = open(osjoin(patch, RSG_NAME + ".section2"), "rb").read()
+				stats.add("read", start, len(patch_data))
 				patch_length = len(patch_data)
 				if len(patch_data) == DECOMPRESSED_IMAGE_DATA_SIZE:
 					image_data = patch_data
@@ -163,7 +183,9 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 		elif COMPRESSION_FLAGS & 1 == 0: # Decompressed files
 			image_data = bytearray(pathout_data[IMAGE_DATA_OFFSET: IMAGE_DATA_OFFSET + COMPRESSED_IMAGE_DATA_SIZE])
 		else: # Compressed files
+			start = perf_counter()
 			image_data = bytearray(decompress(pathout_data[IMAGE_DATA_OFFSET: IMAGE_DATA_OFFSET + COMPRESSED_IMAGE_DATA_SIZE]))
+			stats.add("decompress", start, COMPRESSED_IMAGE_DATA_SIZE, len(image_data))
 
 	if 4 < level:
 		DATA_DICT = {
@@ -176,44 +198,21 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 				"FILE_OFFSET": DECOMPRESSED_IMAGE_DATA_SIZE
 			}
 		}
-		NAME_DICT = {}
-		temp = INFO_OFFSET
-		file.seek(INFO_OFFSET)
-		while temp < INFO_LIMIT:
-			FILE_NAME = b""
-			for key in list(NAME_DICT.keys()):
-				if NAME_DICT[key] + INFO_OFFSET < temp:
-					NAME_DICT.pop(key)
-				else:
-					FILE_NAME = key
-			BYTE = b""
-			while BYTE != b"\0":
-				FILE_NAME += BYTE
-				BYTE = file.read(1)
-				LENGTH = 4 * unpack("<I", file.read(3) + b"\0")[0]
-				if LENGTH != 0:
-					NAME_DICT[FILE_NAME] = LENGTH
-
-			DECODED_NAME = FILE_NAME.decode().replace("\\", sep)
-			IS_IMAGE = unpack("<I", file.read(4))[0] == 1
-			FILE_OFFSET = unpack("<I", file.read(4))[0]
-			FILE_SIZE = unpack("<I", file.read(4))[0]
-			if IS_IMAGE:
-				file.seek(20, 1)
-				#IMAGE_ENTRY = unpack("<I", file.read(4))[0]
-				#file.seek(8, 1)
-				#WIDHT = unpack("<I", file.read(4))[0]
-				#HEIGHT = unpack("<I", file.read(4))[0]
-				temp = file.tell()
+		start = perf_counter()
+		entries = rsg_file_list(pathout_data, INFO_OFFSET, INFO_LIMIT)
+		stats.add("name table", start, INFO_LIMIT - INFO_OFFSET)
+		for entry in entries:
+			DECODED_NAME = entry.name.replace("\\", sep)
+			if entry.is_image:
 				IMAGE_DATA_DICT[DECODED_NAME] = {
-					"FILE_INFO": temp,
-					"FILE_OFFSET": FILE_OFFSET
+					"FILE_IMAGE": entry.image,
+					"FILE_INFO": entry.info,
+					"FILE_OFFSET": entry.offset
 				}
 			else:
-				temp = file.tell()
 				DATA_DICT[DECODED_NAME] = {
-					"FILE_INFO": temp,
-					"FILE_OFFSET": FILE_OFFSET
+					"FILE_INFO": entry.info,
+					"FILE_OFFSET": entry.offset
 				}
 		
 		DECODED_NAME = ""
@@ -225,33 +224,57 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 				FILE_INFO = DATA_DICT[DECODED_NAME]["FILE_INFO"]
 				if NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith):
 					try:
+						start = perf_counter()
 						if level < 7:
 							file_name = osjoin(patch, DECODED_NAME)
 							patch_data = open(file_name, "rb").read()
+							stats.add("read", start, len(patch_data))
 						elif NAME_CHECK[-5:] == ".rton":
 							file_name = osjoin(patch, DECODED_NAME[:-5] + ".JSON")
-							patch_data = encode_root_object(open(file_name, "rb"))
+							file = open(file_name, "rb")
+							patch_data = encode_root_object(file)
+							stats.add("rton encode", start, file.tell(), len(patch_data))
 						else:
 							raise FileNotFoundError
 
 						if NAME_CHECK[-5:] == ".rton" and 5 < level and (overrideEncryption == 1 or overrideEncryption < 0 and data[FILE_OFFSET: FILE_OFFSET + 2] == b"\x10\0") and patch_data[0:2] != b"\x10\0":
+							stage_start = perf_counter()
 							patch_data = b'\x10\0' + rijndael_cbc.encrypt(patch_data)
+							stats.add("encrypt", stage_start, len(patch_data) - 2, len(patch_data))
 						
 						FILE_SIZE = len(patch_data)
 						patch_data += extend_to_4096(FILE_SIZE)
 						data[FILE_OFFSET: FILE_OFFSET_NEW] = patch_data
-						pathout_data[FILE_INFO - 4: FILE_INFO] = pack("<I", FILE_SIZE)
+						pathout_data[FILE_INFO + 8: FILE_INFO + 12] = pack("<I", FILE_SIZE)
 						DATA_SHIFT += FILE_OFFSET + len(patch_data) - FILE_OFFSET_NEW
 						FILE_OFFSET_NEW = FILE_OFFSET + len(patch_data)
 						print("patched " + relpath(file_name, patchout))
+						stats.file(file_name, start)
 					except FileNotFoundError:
 						pass
 					except Exception as e:
 						error_message(e, " while patching " + file_name)
-				pathout_data[FILE_INFO - 8: FILE_INFO - 4] = pack("<I", FILE_OFFSET)
+				pathout_data[FILE_INFO + 4: FILE_INFO + 8] = pack("<I", FILE_OFFSET)
 			FILE_OFFSET = FILE_OFFSET_NEW
 			DECODED_NAME = DECODED_NAME_NEW
 		
+		# Encode the edited PNGs together, on the workers if there are any
+		PNG_LIST = []
+		for DECODED_NAME, FILE in IMAGE_DATA_DICT.items():
+			NAME_CHECK = DECODED_NAME.replace("\\", "/").lower()
+			if DECODED_NAME and NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith) and FILE["FILE_IMAGE"] < len(textures) and textures[FILE["FILE_IMAGE"]] is not None:
+				file_name = osjoin(patch, splitext(DECODED_NAME)[0] + ".PNG")
+				if isfile(file_name):
+					PNG_LIST.append((DECODED_NAME, (file_name,) + textures[FILE["FILE_IMAGE"]]))
+		start = perf_counter()
+		pool = worker_pool()
+		if pool is None or len(PNG_LIST) < 2:
+			PTX_DICT = dict((DECODED_NAME, ptx_encode_task(task)) for DECODED_NAME, task in PNG_LIST)
+		else:
+			PTX_DICT = dict(zip([DECODED_NAME for DECODED_NAME, task in PNG_LIST], pool.map(ptx_encode_task, [task for DECODED_NAME, task in PNG_LIST])))
+		if PNG_LIST:
+			stats.add("ptx encode", start, 0, sum(len(ptx) for ptx in PTX_DICT.values() if not isinstance(ptx, Exception)), len(PNG_LIST))
+
 		DECODED_NAME = ""
 		IMAGE_DATA_SHIFT = 0
 		for DECODED_NAME_NEW in sorted(IMAGE_DATA_DICT, key = lambda key: IMAGE_DATA_DICT[key]["FILE_OFFSET"]):
@@ -261,11 +284,16 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 				FILE_INFO = IMAGE_DATA_DICT[DECODED_NAME]["FILE_INFO"]
 				if NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith):
 					try:
-						#if level < 7:
-						file_name = osjoin(patch, DECODED_NAME)
-						patch_data = open(file_name, "rb").read()
-						#else:
-						#	raise FileNotFoundError
+						start = perf_counter()
+						if DECODED_NAME in PTX_DICT:
+							file_name = osjoin(patch, splitext(DECODED_NAME)[0] + ".PNG")
+							patch_data = PTX_DICT[DECODED_NAME]
+							if isinstance(patch_data, Exception):
+								raise patch_data
+						else:
+							file_name = osjoin(patch, DECODED_NAME)
+							patch_data = open(file_name, "rb").read()
+							stats.add("read", start, len(patch_data))
 
 						FILE_SIZE = len(patch_data)
 						if FILE_SIZE == 0:
@@ -273,15 +301,16 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 						else:
 							patch_data += extend_to_4096(FILE_SIZE)
 							image_data[FILE_OFFSET: FILE_OFFSET_NEW] = patch_data
-							pathout_data[FILE_INFO - 24: FILE_INFO - 20] = pack("<I", FILE_SIZE)
+							pathout_data[FILE_INFO + 8: FILE_INFO + 12] = pack("<I", FILE_SIZE)
 							IMAGE_DATA_SHIFT += FILE_OFFSET + len(patch_data) - FILE_OFFSET_NEW
 							FILE_OFFSET_NEW = FILE_OFFSET + len(patch_data)
 							print("patched " + relpath(file_name, patchout))
+							stats.file(file_name, start)
 					except FileNotFoundError:
 						pass
 					except Exception as e:
 						error_message(e, " while patching " + file_name)
-				pathout_data[FILE_INFO - 28: FILE_INFO - 24] = pack("<I", FILE_OFFSET)
+				pathout_data[FILE_INFO + 4: FILE_INFO + 8] = pack("<I", FILE_OFFSET)
 			FILE_OFFSET = FILE_OFFSET_NEW
 			DECODED_NAME = DECODED_NAME_NEW
 	
@@ -294,13 +323,14 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 		if COMPRESSION_FLAGS & 2 == 0: # Decompressed files
 			COMPRESSED_DATA_SIZE = DECOMPRESSED_DATA_SIZE
 		else:
+			start = perf_counter()
 			data = compress(data, 9)
+			stats.add("compress", start, DECOMPRESSED_DATA_SIZE, len(data))
 			data += extend_to_4096(len(data))
 			COMPRESSED_DATA_SIZE = len(data)
 			
 		pathout_data[DATA_OFFSET: IMAGE_DATA_OFFSET] = data
-		pathout_data[28:36] = pack("<I", COMPRESSED_DATA_SIZE) + pack("<I", DECOMPRESSED_DATA_SIZE)
-		pathout_data[40:44] = pack("<I", DATA_OFFSET + COMPRESSED_DATA_SIZE)
+		header = header._replace(compressed_data_size = COMPRESSED_DATA_SIZE, decompressed_data_size = DECOMPRESSED_DATA_SIZE, image_data_offset = DATA_OFFSET + COMPRESSED_DATA_SIZE)
 		if level < 5:
 			print("patched " + relpath(osjoin(patch, RSG_NAME + ".section"), patchout))
 		
@@ -313,121 +343,55 @@ def rsg_patch_data(RSG_NAME, file, pathout_data, patch, patchout, level):
 		if COMPRESSION_FLAGS & 1 == 0: # Decompressed files
 			COMPRESSED_IMAGE_DATA_SIZE = DECOMPRESSED_IMAGE_DATA_SIZE
 		else:
+			start = perf_counter()
 			image_data = compress(image_data, 9)
+			stats.add("compress", start, DECOMPRESSED_IMAGE_DATA_SIZE, len(image_data))
 			image_data += extend_to_4096(len(image_data))
 			COMPRESSED_IMAGE_DATA_SIZE = len(image_data)
 		
 		pathout_data[IMAGE_DATA_OFFSET:] = image_data
-		pathout_data[44:52] = pack("<I", COMPRESSED_IMAGE_DATA_SIZE) + pack("<I", DECOMPRESSED_IMAGE_DATA_SIZE)
+		header = header._replace(compressed_image_data_size = COMPRESSED_IMAGE_DATA_SIZE, decompressed_image_data_size = DECOMPRESSED_IMAGE_DATA_SIZE)
 		if level < 5:
 			print("patched " + relpath(osjoin(patch, RSG_NAME + ".section2"), patchout))
 	
-	pathout_data[16:20] = pack("<I", COMPRESSION_FLAGS)
+	header._replace(compression_flags = COMPRESSION_FLAGS).pack_into(pathout_data)
 	return pathout_data
-def rsb_patch_data(file, pathout_data, patch, patchout, level):
-	VERSION = unpack('<L', file.read(4))[0]
-
-	file.seek(4, 1)
-	HEADER_SIZE = unpack('<L', file.read(4))[0]
-
-	FILE_LIST_SIZE = unpack('<L', file.read(4))[0]
-	FILE_LIST_OFFSET = unpack('<L', file.read(4))[0]
-
-	file.seek(8, 1)
-	SUBGROUP_LIST_SIZE = unpack('<L', file.read(4))[0]
-	SUBGROUP_LIST_OFFSET = unpack('<L', file.read(4))[0]
-	SUBGROUP_INFO_ENTRIES = unpack("<I", file.read(4))[0]
-	SUBGROUP_INFO_OFFSET = unpack("<I", file.read(4))[0]
-	SUBGROUP_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	GROUP_INFO_ENTRIES = unpack('<L', file.read(4))[0]
-	GROUP_INFO_OFFSET = unpack('<L', file.read(4))[0]
-	GROUP_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	GROUP_LIST_SIZE = unpack('<L', file.read(4))[0]
-	GROUP_LIST_OFFSET = unpack('<L', file.read(4))[0]
-
-	AUTOPOOL_INFO_ENTRIES = unpack('<L', file.read(4))[0]
-	AUTOPOOL_INFO_OFFSET = unpack('<L', file.read(4))[0]
-	AUTOPOOL_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	PTX_INFO_ENTRIES = unpack('<L', file.read(4))[0]
-	PTX_INFO_OFFSET = unpack('<L', file.read(4))[0]
-	PTX_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
+def rsb_patch_data(pathout_data, encoders, patch, patchout, level):
+	rsb_header = RSBHeader.unpack_from(pathout_data)
 
-	DIRECTORY_7_OFFSET = unpack('<L', file.read(4))[0]
-	DIRECTORY_8_OFFSET = unpack('<L', file.read(4))[0]
-	DIRECTORY_9_OFFSET = unpack('<L', file.read(4))[0]
-
-	if VERSION == 4:
-		HEADER_SIZE_2 = unpack('<L', file.read(4))[0]
-
-	# TEXTURE_FORMATS = []
-	# file.seek(DIRECTORY_6_OFFSET)
-	# for IMAGE_ID in range(0, DIRECTORY_6_ENTRIES):
-	# 	WIDHT = unpack("<I", file.read(4))[0]
-	# 	HEIGHT = unpack("<I", file.read(4))[0]
-	# 	WIDHT_BYTES = unpack("<I", file.read(4))[0]
-	# 	TEXTURE_FORMAT = unpack("<I", file.read(4))[0]
-	# 	if DIRECTORY_6_ENTRY_SIZE == 24:
-	# 		COMPRESSED_IMAGE_SIZE = unpack("<I", file.read(4))[0]
-	# 		HUNDRED = unpack("<I", file.read(4))[0]
-
-	# 	TEXTURE_FORMATS.append(TEXTURE_FORMAT)
+	if encoders:
+		PTX_INFO = rsb_ptx_info(pathout_data, rsb_header)
 	
-	file.seek(SUBGROUP_INFO_OFFSET)
 	SUBGROUP_LIST = {}
-	for i in range(0, SUBGROUP_INFO_ENTRIES):
-		RSG_INFO = file.tell()
-		RSG_NAME = file.read(128).strip(b"\0").decode()
-		RSG_OFFSET = unpack("<I", file.read(4))[0]
-		RSG_SIZE = unpack("<I", file.read(4))[0]
-		SUBGROUP_ID = unpack("<I", file.read(4))[0]
-
-		RSG_COMPRESSION_FLAGS = unpack("<I", file.read(4))[0]
-		RSG_HEADER_LENGTH = unpack("<I", file.read(4))[0]
-
-		RSG_DATA_OFFSET = unpack("<I", file.read(4))[0]
-		RSG_COMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-		RSG_DECOMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-		RSG_DECOMPRESSED_DATA_SIZE_B = unpack("<I", file.read(4))[0]
-		
-		RSG_IMAGE_DATA_OFFSET = unpack("<I", file.read(4))[0]
-		RSG_COMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-		RSG_DECOMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-
-		file.seek(20, 1)
-		IMAGE_ENTRIES = unpack("<I", file.read(4))[0]
-		IMAGE_ID = unpack("<I", file.read(4))[0]
-		
-		SUBGROUP_LIST[RSG_NAME] = {
-			"RSG_OFFSET": RSG_OFFSET,
-			"RSG_SIZE": RSG_IMAGE_DATA_OFFSET + RSG_COMPRESSED_IMAGE_DATA_SIZE,
-			"RSG_INFO": RSG_INFO
-		}
+	for info_start in rsb_subgroup_offsets(rsb_header):
+		info = SubgroupInfo.unpack_from(pathout_data, info_start)
+		SUBGROUP_LIST[info.name.strip(b"\0").decode()] = (info_start, info)
 	
 	RSG_SHIFT = 0
-	for RSG_NAME in sorted(SUBGROUP_LIST, key = lambda key: SUBGROUP_LIST[key]["RSG_OFFSET"]):
-		RSG_OFFSET = RSG_SHIFT + SUBGROUP_LIST[RSG_NAME]["RSG_OFFSET"]
-		RSG_SIZE = SUBGROUP_LIST[RSG_NAME]["RSG_SIZE"]
-		info_start = SUBGROUP_LIST[RSG_NAME]["RSG_INFO"]
+	for RSG_NAME in sorted(SUBGROUP_LIST, key = lambda key: SUBGROUP_LIST[key][1].rsg_offset):
+		info_start, info = SUBGROUP_LIST[RSG_NAME]
+		RSG_OFFSET = RSG_SHIFT + info.rsg_offset
+		RSG_SIZE = info.image_data_offset + info.compressed_image_data_size
 		RSG_CHECK = RSG_NAME.lower()
 		if RSG_CHECK.startswith(rsgStartsWith) and RSG_CHECK.endswith(rsgEndsWith):
 			try:
 				if level < 4:
 					file_path = osjoin(patch, RSG_NAME + ".rsg")
+					start = perf_counter()
 					subdata = bytearray(open(file_path, "rb").read())
+					stats.add("read", start, len(subdata))
 				else:
 					subdata = pathout_data[RSG_OFFSET: RSG_OFFSET + RSG_SIZE]
-					subdata[16:36] = pathout_data[info_start + 140:info_start + 160]
-					subdata[40:52] = pathout_data[info_start + 164:info_start + 176]
-					subdata = rsg_patch_data(RSG_NAME, BytesIO(subdata), subdata, patch, patchout, level)
+					info.rsg_header(subdata).pack_into(subdata)
+					textures = []
+					if encoders:
+						textures = ptx_textures(PTX_INFO[info.image_id: info.image_id + info.image_entries], encoders)
+					subdata = rsg_patch_data(RSG_NAME, subdata, textures, patch, patchout, level)
 				
 				subdata[:4] = b"pgsr"
 				subdata += extend_to_4096(len(subdata))
 				pathout_data[RSG_OFFSET: RSG_OFFSET + RSG_SIZE] = subdata
-				pathout_data[info_start + 132:info_start + 136] = pack("<I", len(subdata)) #RSG_SIZE
-				pathout_data[info_start + 140:info_start + 176] = subdata[16:36] + subdata[32:36] + subdata[40:52]
+				info = info.with_rsg_header(RSGHeader.unpack_from(subdata))._replace(rsg_size = len(subdata))
 				RSG_SHIFT += len(subdata) - RSG_SIZE
 				if level < 4:
 					print("applied " + relpath(file_path, patchout))
@@ -435,7 +399,7 @@ def rsb_patch_data(file, pathout_data, patch, patchout, level):
 				pass
 			except Exception as e:
 				error_message(e, " while patching " + RSG_NAME + ".rsg")
-		pathout_data[info_start + 128:info_start + 132] = pack("<I", RSG_OFFSET)
+		info._replace(rsg_offset = RSG_OFFSET).pack_into(pathout_data, info_start)
 	return pathout_data
 def file_to_folder(inp, out, patch, level, extensions, pathout, patchout):
 # Recursive file convert function
@@ -446,33 +410,45 @@ def file_to_folder(inp, out, patch, level, extensions, pathout, patchout):
 			COMPRESSED = HEADER == b"\xD4\xFE\xAD\xDE" and 2 < level
 			if COMPRESSED:
 				DECOMPRESSED_SIZE = unpack("<I", file.read(4))[0]
-				pathout_data = decompress(file.read())
-				file = BytesIO(pathout_data)
-				file.name = inp
-				HEADER = file.read(4)
+				# Inflate into the buffer that's patched, the RSB is only kept in memory once
+				start = perf_counter()
+				pathout_data = decompress_bytearray(file, DECOMPRESSED_SIZE)
+				stats.add("decompress", start, file.tell(), len(pathout_data))
+				HEADER = bytes(pathout_data[:4])
 
 			if HEADER == b"1bsr":
 				if not COMPRESSED:
-					pathout_data = HEADER + file.read()
-					file.seek(4)
+					pathout_data = mmap(file.fileno(), 0, access = ACCESS_READ)
 				
 				if level > 2:
-					pathout_data = rsb_patch_data(file, bytearray(pathout_data), patch, patchout, level)
+					if not COMPRESSED:
+						start = perf_counter()
+						pathout_data = bytearray(pathout_data)
+						stats.add("read", start, len(pathout_data))
+					pathout_data = rsb_patch_data(pathout_data, ptx_encoders(inp, level), patch, patchout, level)
 				if level < 3 or COMPRESSED:
 					tag, extension = splitext(out)
 					tag += ".tag" + extension
 					open(tag, "wb").write(md5(pathout_data).hexdigest().upper().encode() + b"\r\n")
 					green_print("wrote " + relpath(tag, pathout))
-					pathout_data = b"\xD4\xFE\xAD\xDE" + pack("<I", len(pathout_data)) + compress(pathout_data, level = 9)
-				
-				open(out, "wb").write(pathout_data)
+					start = perf_counter()
+					with open(out, "wb") as output:
+						output.write(b"\xD4\xFE\xAD\xDE" + pack("<I", len(pathout_data)))
+						compress_stream(pathout_data, output)
+						stats.add("compress", start, len(pathout_data), output.tell())
+				else:
+					start = perf_counter()
+					open(out, "wb").write(pathout_data)
+					stats.add("write", start, 0, len(pathout_data))
 				green_print("wrote " + relpath(out, pathout))
 			elif HEADER == b"pgsr":
 				try:
-					pathout_data = bytearray(HEADER + file.read())
-					file.seek(0)
-					pathout_data = rsg_patch_data("data", file, pathout_data, patch, patchout, level)
+					if not COMPRESSED:
+						pathout_data = bytearray(HEADER + file.read())
+					pathout_data = rsg_patch_data("data", pathout_data, [], patch, patchout, level)
+					start = perf_counter()
 					open(out, "wb").write(pathout_data)
+					stats.add("write", start, 0, len(pathout_data))
 					green_print("wrote " + relpath(out, pathout))
 				except Exception as e:
 					error_message(e, " while patching " + inp)
@@ -494,61 +470,72 @@ def file_to_folder(inp, out, patch, level, extensions, pathout, patchout):
 					file_to_folder(input_file, output_file, splitext(patch_file)[0], level, extensions, pathout, patchout)
 			elif input_file != pathout and inp != patchout:
 				file_to_folder(input_file, output_file, patch_file, level, extensions, pathout, patchout)
-def conversion(inp, out, level, extensions, pathout):
-# Convert file
-	if isfile(inp):
-		try:
-			file = open(inp, "rb")
-			if file.read(4) == b"RTON":
-				if level < 7:
-					open(out,"wb").write(b'\x10\0' + rijndael_cbc.encrypt(b"RTON" + file.read()))
-					print("wrote " + relpath(out, pathout))
-			elif level > 6:
+def conversion_file(inp, out, level, pathout):
+# Convert a single file
+	try:
+		start = perf_counter()
+		file = open(inp, "rb")
+		if file.read(4) == b"RTON":
+			if level < 7:
 				file.seek(0)
-				encoded_data = encode_root_object(file)
-				open(out, "wb").write(encoded_data)
+				with temp_output(out) as output:
+					output.write(b'\x10\0')
+					rijndael_cbc.encrypt_stream(file, output)
+					stats.add("encrypt", start, file.tell(), output.tell())
 				print("wrote " + relpath(out, pathout))
-		except Exception as e:
-			error_message(e, " in " + inp)
+		elif level > 6:
+			file.seek(0)
+			with temp_output(out) as output:
+				write_root_object(file, output.write)
+				stats.add("rton encode", start, file.tell(), output.tell())
+			print("wrote " + relpath(out, pathout))
+	except Exception as e:
+		error_message(e, " in " + inp)
+	stats.file(inp, start)
+def conversion_list(inp, out, level, extensions, pathout, tasks):
+# Recursively list the files to convert, sorted by name
+	makedirs(out, exist_ok = True)
+	with scandir(inp) as entries:
+		entries = sorted(entries, key = lambda entry: entry.name)
+	for entry in entries:
+		input_file = entry.path
+		output_file = osjoin(out, entry.name)
+		if entry.is_file():
+			check = entry.name.lower()
+			if level > 6:
+				output_file = output_file[:-5]
+				if "" == splitext(output_file)[1] and not check.startswith(RTONNoExtensions):
+					output_file += ".rton"
+			if check[-5:] == extensions:
+				tasks.append((input_file, output_file, level, pathout))
+		elif entry.is_dir() and input_file != pathout:
+			conversion_list(input_file, output_file, level, extensions, pathout, tasks)
+def conversion(inp, out, level, extensions, pathout):
+# Convert a file or all files in a directory
+	if isfile(inp):
+		conversion_file(inp, out, level, pathout)
 	elif isdir(inp):
-		makedirs(out, exist_ok = True)
-		for entry in listdir(inp):
-			input_file = osjoin(inp, entry)
-			output_file = osjoin(out, entry)
-			if isfile(input_file):
-				check = entry.lower()
-				if level > 6:
-					output_file = output_file[:-5]
-					if "" == splitext(output_file)[1] and not check.startswith(RTONNoExtensions):
-						output_file += ".rton"
-				if check[-5:] == extensions:
-					conversion(input_file, output_file, level, extensions, pathout)
-			elif input_file != pathout:
-				conversion(input_file, output_file, level, extensions, pathout)
-# Start of the code
-try:
-	application_path = initialize()
-	logerror = LogError(osjoin(application_path, "fail.txt"))
-	error_message = logerror.error_message
-	warning_message = logerror.warning_message
-	input_level = logerror.input_level
-	logerror.check_version(3, 9, 0)
-	
-	print("""\033[95m
-\033[1mOBBPatcher v1.2.0 (c) 2022 Nineteendo\033[22m
-\033[1mCode based on:\033[22m Luigi Auriemma, Small Pea & 1Zulu
-\033[1mDocumentation:\033[22m Watto Studios, YingFengTingYu, TwinKleS-C & h3x4n1um
-\033[1mFollow PyVZ2 development:\033[22m \033[4mhttps://discord.gg/CVZdcGKVSw\033[24m
-\033[0m""")
-	options = logerror.load_template(options, osjoin(application_path, "options"), 2)
-	level_to_name = ["SPECIFY", "SMF", "RSB", "RSG", "SECTION", "ENCRYPTED", "ENCODED", "DECODED"]
-	list_levels(level_to_name)
-	options["encodedUnpackLevel"] = input_level("ENCODED Unpack Level", 6, 7, options["encodedUnpackLevel"])
-	options["encryptedUnpackLevel"] = input_level("ENCRYPTED Unpack Level", 5, 6, options["encryptedUnpackLevel"])
-	options["rsgUnpackLevel"] = input_level("RSG/RSB/SMF Unpack Level", 3, 7, options["rsgUnpackLevel"])
-	options["rsbUnpackLevel"] = input_level("RSB/SMF Unpack Level", 2, 3, options["rsbUnpackLevel"])
-	options["smfUnpackLevel"] = input_level("SMF Unpack Level", 1, 2, options["smfUnpackLevel"])
-	
+		tasks = []
+		conversion_list(inp, out, level, extensions, pathout, tasks)
+		pool = worker_pool()
+		if pool is None:
+			for task in tasks:
+				conversion_file(*task)
+		else:
+			# Replay the output and logs in the order of the files
+			for output, fail, result in pool.imap(conversion_task, tasks, 16):
+				print(output, end = "")
+				logerror.log(fail)
+				stats.merge(result)
+pool = None
+stats = None
+def initialize_options(options, log):
+# Set the globals used by the patch functions, also called in every worker process
+	global logerror, error_message, warning_message, rsgStartsWith, rsgEndsWith, rijndael_cbc, pathStartsWith, pathEndsWith, RTONNoExtensions, json_decoder, encode_root_object, write_root_object, stats
+	logerror = log
+	error_message = log.error_message
+	warning_message = log.warning_message
+	stats = Stats(options["slowestFiles"])
 	if options["rsgStartsWithIgnore"]:
 		rsgStartsWith = ""
 	else:
@@ -559,13 +546,6 @@ try:
 		rsgEndsWith = options["rsgEndsWith"]
 	
 	rijndael_cbc = RijndaelCBC(str.encode(options["encryptionKey"]), 24)
-	if 7 >= options["rsgUnpackLevel"] > 3:
-		list_levels(["SPECIFY", "DEFAULT", "DISABLE", "ENABLE"])
-		overrideDataCompression = 2 * (input_level("Compress Data Override", 1, 3, options["overrideDataCompression"]) - 2)
-		overrideImageDataCompression = input_level("Compress Image Data Override", 1, 3, options["overrideImageDataCompression"]) - 2
-	if 7 >= options["rsgUnpackLevel"] > 5:
-		overrideEncryption = input_level("Encrypt Override", 1, 3, options["overrideEncryption"]) - 2
-	
 	if options["pathEndsWithIgnore"]:
 		pathEndsWith = ""
 	else:
@@ -575,60 +555,127 @@ try:
 	else:
 		pathStartsWith = options["pathStartsWith"]
 	RTONNoExtensions = options["RTONNoExtensions"]
-	encode_root_object = JSONDecoder().encode_root_object
+	json_decoder = JSONDecoder()
+	encode_root_object = json_decoder.encode_root_object
+	write_root_object = json_decoder.write_root_object
+def initialize_worker(options):
+# Worker processes keep their log in memory, it's sent back with the result
+	initialize_options(options, LogError(None))
+def logged_task(function, args):
+# Call a function in a worker process, returns what was printed, logged and counted
+	logerror.fail = StringIO()
+	stats.reset()
+	with redirect_stdout(StringIO()) as output:
+		function(*args)
+	return (output.getvalue(), logerror.fail.getvalue(), stats.result())
+def conversion_task(task):
+# Convert a file in a worker process
+	return logged_task(conversion_file, task)
+def ptx_encode_task(task):
+# Encode a PNG in a worker process, errors are returned to be logged for the file
+	try:
+		return ptx_encode(*task)
+	except Exception as e:
+		return e
+def worker_pool():
+# Pool of worker processes, None if only 1 worker is used
+	global pool
+	if pool is None and options["workers"] > 1:
+		pool = Pool(options["workers"], initialize_worker, (options,))
+	return pool
+# Start of the code
+if __name__ == "__main__":
+	freeze_support()
+	try:
+		application_path = initialize()
+		logerror = LogError(osjoin(application_path, "fail.txt"))
+		error_message = logerror.error_message
+		warning_message = logerror.warning_message
+		input_level = logerror.input_level
+		logerror.check_version(3, 9, 0)
+		
+		print("""\033[95m
+\033[1mOBBPatcher v1.2.0 (c) 2022 Nineteendo\033[22m
+\033[1mCode based on:\033[22m Luigi Auriemma, Small Pea & 1Zulu
+\033[1mDocumentation:\033[22m Watto Studios, YingFengTingYu, TwinKleS-C & h3x4n1um
+\033[1mFollow PyVZ2 development:\033[22m \033[4mhttps://discord.gg/CVZdcGKVSw\033[24m
+\033[0m""")
+		options = logerror.load_template(options, osjoin(application_path, "options"), 2)
+		level_to_name = ["SPECIFY", "SMF", "RSB", "RSG", "SECTION", "ENCRYPTED", "ENCODED", "DECODED"]
+		list_levels(level_to_name)
+		options["encodedUnpackLevel"] = input_level("ENCODED Unpack Level", 6, 7, options["encodedUnpackLevel"])
+		options["encryptedUnpackLevel"] = input_level("ENCRYPTED Unpack Level", 5, 6, options["encryptedUnpackLevel"])
+		options["rsgUnpackLevel"] = input_level("RSG/RSB/SMF Unpack Level", 3, 7, options["rsgUnpackLevel"])
+		options["rsbUnpackLevel"] = input_level("RSB/SMF Unpack Level", 2, 3, options["rsbUnpackLevel"])
+		options["smfUnpackLevel"] = input_level("SMF Unpack Level", 1, 2, options["smfUnpackLevel"])
+		
+		initialize_options(options, logerror)
+		if 7 >= options["rsgUnpackLevel"] > 3:
+			list_levels(["SPECIFY", "DEFAULT", "DISABLE", "ENABLE"])
+			overrideDataCompression = 2 * (input_level("Compress Data Override", 1, 3, options["overrideDataCompression"]) - 2)
+			overrideImageDataCompression = input_level("Compress Image Data Override", 1, 3, options["overrideImageDataCompression"]) - 2
+		if 7 >= options["rsgUnpackLevel"] > 5:
+			overrideEncryption = input_level("Encrypt Override", 1, 3, options["overrideEncryption"]) - 2
 
-	blue_print("\nWorking directory: " + getcwd())
-	if 7 >= options["encodedUnpackLevel"] > 6:
-		encoded_input = path_input("ENCODED " + level_to_name[options["encodedUnpackLevel"]] + " Input file or directory", options["encodedUnpacked"])
-		if isfile(encoded_input):
-			encoded_output = path_input("ENCODED Output file", options["encodedPacked"])
-		else:
-			encoded_output = path_input("ENCODED Output directory", options["encodedPacked"])
-	if 6 >= options["encryptedUnpackLevel"] > 5:
-		encrypted_input = path_input("ENCRYPTED " + level_to_name[options["encryptedUnpackLevel"]] + " Input file or directory", options["encryptedUnpacked"])
-		if isfile(encrypted_input):
-			encrypted_output = path_input("ENCRYPTED Output file", options["encryptedPacked"])
-		else:
-			encrypted_output = path_input("ENCRYPTED Output directory", options["encryptedPacked"])
-	if 7 >= options["rsgUnpackLevel"] > 3:
-		rsg_input = path_input("RSG/RSB/SMF Input file or directory", options["rsgPacked"])
-		if isfile(rsg_input):
-			rsg_output = path_input("RSG/RSB/SMF Modded file", options["rsgPatched"])
-		else:
-			rsg_output = path_input("RSG/RSB/SMF Modded directory", options["rsgPatched"])
-		rsg_patch = path_input("RSG/RSB/SMF " + level_to_name[options["rsgUnpackLevel"]] + " Patch directory", options["rsgUnpacked"])
-	
-	if 3 >= options["rsbUnpackLevel"] > 2:
-		rsb_input = path_input("RSB/SMF Input file or directory", options["rsbPacked"])
-		if isfile(rsb_input):
-			rsb_output = path_input("RSB/SMF Modded file", options["rsbPatched"])
-		else:
-			rsb_output = path_input("RSB/SMF Modded directory", options["rsbPatched"])
-		rsb_patch = path_input("RSB/SMF " + level_to_name[options["rsbUnpackLevel"]] + " Patch directory", options["rsbUnpacked"])
-	
-	if 2 >= options["smfUnpackLevel"] > 1:
-		smf_input = path_input("SMF " + level_to_name[options["smfUnpackLevel"]] + " Input file or directory", options["smfUnpacked"])
-		if isfile(smf_input):
-			smf_output = path_input("SMF Output file", options["smfPacked"])
-		else:
-			smf_output = path_input("SMF Output directory", options["smfPacked"])
+		blue_print("\nWorking directory: " + getcwd())
+		if 7 >= options["encodedUnpackLevel"] > 6:
+			encoded_input = path_input("ENCODED " + level_to_name[options["encodedUnpackLevel"]] + " Input file or directory", options["encodedUnpacked"])
+			if isfile(encoded_input):
+				encoded_output = path_input("ENCODED Output file", options["encodedPacked"])
+			else:
+				encoded_output = path_input("ENCODED Output directory", options["encodedPacked"])
+		if 6 >= options["encryptedUnpackLevel"] > 5:
+			encrypted_input = path_input("ENCRYPTED " + level_to_name[options["encryptedUnpackLevel"]] + " Input file or directory", options["encryptedUnpacked"])
+			if isfile(encrypted_input):
+				encrypted_output = path_input("ENCRYPTED Output file", options["encryptedPacked"])
+			else:
+				encrypted_output = path_input("ENCRYPTED Output directory", options["encryptedPacked"])
+		if 7 >= options["rsgUnpackLevel"] > 3:
+			rsg_input = path_input("RSG/RSB/SMF Input file or directory", options["rsgPacked"])
+			if isfile(rsg_input):
+				rsg_output = path_input("RSG/RSB/SMF Modded file", options["rsgPatched"])
+			else:
+				rsg_output = path_input("RSG/RSB/SMF Modded directory", options["rsgPatched"])
+			rsg_patch = path_input("RSG/RSB/SMF " + level_to_name[options["rsgUnpackLevel"]] + " Patch directory", options["rsgUnpacked"])
+		
+		if 3 >= options["rsbUnpackLevel"] > 2:
+			rsb_input = path_input("RSB/SMF Input file or directory", options["rsbPacked"])
+			if isfile(rsb_input):
+				rsb_output = path_input("RSB/SMF Modded file", options["rsbPatched"])
+			else:
+				rsb_output = path_input("RSB/SMF Modded directory", options["rsbPatched"])
+			rsb_patch = path_input("RSB/SMF " + level_to_name[options["rsbUnpackLevel"]] + " Patch directory", options["rsbUnpacked"])
+		
+		if 2 >= options["smfUnpackLevel"] > 1:
+			smf_input = path_input("SMF " + level_to_name[options["smfUnpackLevel"]] + " Input file or directory", options["smfUnpacked"])
+			if isfile(smf_input):
+				smf_output = path_input("SMF Output file", options["smfPacked"])
+			else:
+				smf_output = path_input("SMF Output directory", options["smfPacked"])
 
-	# Start file_to_folder
-	start_time = datetime.datetime.now()
-	if 7 >= options["encodedUnpackLevel"] > 6:
-		conversion(encoded_input, encoded_output, options["encodedUnpackLevel"], ".json", dirname(encoded_output))
-	if 6 >= options["encryptedUnpackLevel"] > 5:
-		conversion(encrypted_input, encrypted_output, options["encryptedUnpackLevel"], ".rton", dirname(encrypted_output))
-	if 7 >= options["rsgUnpackLevel"] > 3:
-		file_to_folder(rsg_input, rsg_output, rsg_patch, options["rsgUnpackLevel"], options["rsgExtensions"], dirname(rsg_output), rsg_patch)
-	if 3 >= options["rsbUnpackLevel"] > 2:
-		file_to_folder(rsb_input, rsb_output, rsb_patch, options["rsbUnpackLevel"], options["rsbExtensions"], dirname(rsb_output), rsb_patch)
-	if 2 >= options["smfUnpackLevel"] > 1:
-		file_to_folder(smf_input, smf_output, smf_output, options["smfUnpackLevel"], options["rsbExtensions"], dirname(smf_output), dirname(smf_output))
+		# Start file_to_folder
+		start_time = datetime.datetime.now()
+		if 7 >= options["encodedUnpackLevel"] > 6:
+			conversion(encoded_input, encoded_output, options["encodedUnpackLevel"], ".json", dirname(encoded_output))
+		if 6 >= options["encryptedUnpackLevel"] > 5:
+			conversion(encrypted_input, encrypted_output, options["encryptedUnpackLevel"], ".rton", dirname(encrypted_output))
+		if 7 >= options["rsgUnpackLevel"] > 3:
+			file_to_folder(rsg_input, rsg_output, rsg_patch, options["rsgUnpackLevel"], options["rsgExtensions"], dirname(rsg_output), rsg_patch)
+		if 3 >= options["rsbUnpackLevel"] > 2:
+			file_to_folder(rsb_input, rsb_output, rsb_patch, options["rsbUnpackLevel"], options["rsbExtensions"], dirname(rsb_output), rsb_patch)
+		if 2 >= options["smfUnpackLevel"] > 1:
+			file_to_folder(smf_input, smf_output, smf_output, options["smfUnpackLevel"], options["rsbExtensions"], dirname(smf_output), dirname(smf_output))
 
-	logerror.finish_program("finished patching in", start_time)
-except Exception as e:
-	error_message(e)
-except BaseException as e:
-	warning_message(type(e).__name__ + " : " + str(e))
-logerror.close() # Close log
\ No newline at end of file
+		try:
+			stats.finish(osjoin(application_path, "report.json"), (datetime.datetime.now() - start_time).total_seconds())
+		except OSError as e:
+			warning_message("Failed to write report: " + str(e))
+		logerror.finish_program("finished patching in", start_time)
+	except Exception as e:
+		error_message(e)
+	except BaseException as e:
+		warning_message(type(e).__name__ + " : " + str(e))
+	if pool is not None:
+		pool.close()
+		pool.join()
+	logerror.close() # Close log
\ No newline at end of file
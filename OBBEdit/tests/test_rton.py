@@ -0,0 +1,58 @@
+# Encode values whose exact type isn't one of the JSON types
+from collections import OrderedDict
+import sys
+from os.path import dirname, realpath
+import unittest
+
+sys.path.insert(0, dirname(dirname(realpath(__file__))))
+from libraries.pyvz2rton import JSONDecoder, RTID
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+class Text(str):
+# str subclass that isn't an RTID
+	pass
+class Numbers(list):
+# list subclass
+	pass
+class Name(RTID):
+# RTID subclass
+	pass
+
+class SubclassTest(unittest.TestCase):
+	def setUp(self):
+		self.encoder = JSONDecoder()
+	def assertEncodesLike(self, value, expected):
+	# value is encoded like expected as root object & inside an array
+		encode = self.encoder.encode_root_data
+		self.assertEqual(encode({"a": value}), encode({"a": expected}))
+		self.assertEqual(encode({"a": [value]}), encode({"a": [expected]}))
+	def test_ordered_dict(self):
+		self.assertEncodesLike(OrderedDict([("b", 1), ("c", "d")]), {"b": 1, "c": "d"})
+		self.assertEqual(self.encoder.encode_root_data(OrderedDict([("b", 1)])), self.encoder.encode_root_data({"b": 1}))
+	def test_str_subclass(self):
+		self.assertEncodesLike(Text("text"), "text")
+		self.assertEncodesLike(Text("RTID(0)"), "RTID(0)")
+	def test_rtid_subclass(self):
+		self.assertEncodesLike(Name("RTID(Zombie@ZombieTypes)"), RTID("RTID(Zombie@ZombieTypes)"))
+	def test_list_subclass(self):
+		self.assertEncodesLike(Numbers([1, 2.5, None]), [1, 2.5, None])
+	def test_unknown_type(self):
+		with self.assertRaises(TypeError):
+			self.encoder.encode_root_data({"a": object()})
+	@unittest.skipIf(numpy is None, "numpy is not installed")
+	def test_numpy_numbers(self):
+		self.assertEncodesLike(numpy.int64(-70000), -70000)
+		self.assertEncodesLike(numpy.uint8(200), 200)
+		self.assertEncodesLike(numpy.float32(0.5), 0.5)
+		self.assertEncodesLike(numpy.float64(0.1), 0.1)
+	@unittest.skipIf(numpy is None, "numpy is not installed")
+	def test_numpy_bool(self):
+		with self.assertRaises(TypeError):
+			self.encoder.encode_root_data({"a": numpy.bool_(True)})
+
+if __name__ == "__main__":
+	unittest.main()
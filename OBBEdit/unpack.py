@@ -1,16 +1,28 @@
 # Standard libraries
 import datetime
 
-from io import BytesIO
-from os import makedirs, listdir, getcwd, sep
+from collections import deque
+from contextlib import redirect_stdout
+from hashlib import md5
+from io import BytesIO, StringIO
+from json import dump, load
+from mmap import mmap, ACCESS_READ
+from multiprocessing import Pool, freeze_support
+from os import makedirs, listdir, getcwd, scandir, sep, stat
 from os.path import isdir, isfile, join as osjoin, dirname, relpath, splitext
-#from PIL import Image
+try:
+	from PIL import Image
+except ImportError:
+	Image = None
 from struct import unpack
+from time import perf_counter
 from zlib import decompress
 
 # 3th party libraries
-from libraries.pyvz2nineteendo import LogError, blue_print, initialize, path_input, list_levels
+from libraries.pyvz2nineteendo import FileWriter, LogError, NamedMap, Stats, blue_print, decompress_map, decompress_stream, initialize, path_input, temp_output, list_levels
 from libraries.pyvz2rijndael import RijndaelCBC
+from libraries.pyvz2ptx import obb_ptx_decoders, ptx_textures, rsb_ptx_decoders
+from libraries.pyvz2rsb import PTXInfo, RSBHeader, RSGHeader, SubgroupInfo, rsb_ptx_info, rsb_subgroup_offsets, rsg_file_list
 from libraries.pyvz2rton import RTONDecoder
 
 options = {
@@ -71,6 +83,11 @@ options = {
 	"rsgPatched": "",
 	"rsgUnpacked": "",
 	"rsgUnpackLevel": 7,
+	"indexFiles": False,
+	"listFiles": False,
+	"pipelineBytes": 67108864,
+	"slowestFiles": 10,
+	"workers": 1,
 	# Encryption options
 	"encryptedExtensions": (
 		".rton",
@@ -105,313 +122,270 @@ options = {
 	"sortValues": False
 }
 # RSG Unpack functions
-# def ARGB8888(file_data, WIDHT, HEIGHT):
-# 	return Image.frombuffer("RGBA", (WIDHT, HEIGHT), file_data, "raw", "BGRA", 0, 1)
-# def ABGR8888(file_data, WIDHT, HEIGHT):
-# 	return Image.frombuffer("RGBA", (WIDHT, HEIGHT), file_data, "raw", "RGBA", 0, 1)
-# def RGBA4444(file_data, WIDHT, HEIGHT):
-# 	return Image.merge('RGBA', Image.frombuffer("RGBA", (WIDHT, HEIGHT), file_data, "raw", "RGBA;4B", 0, 1).split()[::-1])
-# def RGB565(file_data, WIDHT, HEIGHT):
-# 	return Image.frombuffer("RGB", (WIDHT, HEIGHT), file_data, "raw", "BGR;16", 0, 1)
-# def RGBA5551(file_data, WIDHT, HEIGHT):
-# 	img = Image.new('RGBA', (WIDHT, HEIGHT))
-# 	index = 0
-# 	for y in range(0, HEIGHT):
-# 		for x in range(0, WIDHT):
-# 			a = file_data[index]
-# 			b = file_data[index + 1]
-# 			img.putpixel((x,y), (b & 248, 36 * (b & 7) + (a & 192) // 8, 4 * (a & 62), 255 * (a & 1)))
-# 			index += 2
-# 	return img
-# def RGBABlock32x32(image_decoder, file_data, WIDHT, HEIGHT):
-# 	BLOCK_OFFSET = 0
-# 	img = Image.new('RGBA', (WIDHT, HEIGHT))
-# 	for y in range(0, HEIGHT, 32):
-# 		for x in range(0, WIDHT, 32):
-# 			img.paste(image_decoder(file_data[BLOCK_OFFSET: BLOCK_OFFSET + 2048], 32, 32), (x, y))
-# 			BLOCK_OFFSET += 2048
-# 	return img
-# def RGBBlock32x32(image_decoder, file_data, WIDHT, HEIGHT):
-# 	BLOCK_OFFSET = 0
-# 	img = Image.new('RGB', (WIDHT, HEIGHT))
-# 	for y in range(0, HEIGHT, 32):
-# 		for x in range(0, WIDHT, 32):
-# 			img.paste(image_decoder(file_data[BLOCK_OFFSET: BLOCK_OFFSET + 2048], 32, 32), (x, y))
-# 			BLOCK_OFFSET += 2048
-# 	return img
-# rsb_image_decoders = {
-# 	0: ARGB8888,
-# 	1: RGBA4444,
-# 	2: RGB565,
-# 	3: RGBA5551,
-	
-# 	#5: DXT5,
-
-# 	21: RGBA4444, # 32x32 block
-# 	22: RGB565, # 32x32 block
-# 	23: RGBA5551 # 32x32 block
-
-# 	#30: PVRTC_4BPP_RGBA,
-# 	#31: PVRTC_2BPP_RGBA,
-# 	#32: ETC1_RGB,
-# 	#33: ETC2_RGB,
-# 	#34: ETC2_RGBA,
-# 	#35: DXT1_RGB,
-# 	#36: DXT3_RGBA,
-# 	#37: DXT5_RGBA,
-# 	#38: ATITC_RGB,
-# 	#39: ATITC_RGBA,
-
-# 	#147: ETC1_RGB_A8,
-# 	#148: PVRTC_4BPP_RGB_A8,
-# 	#149: XRGB8888_A8,
-# 	#150: ETC1_RGB_A_Palette
-# }
-# obb_image_decoders = {
-# 	0: ABGR8888,
-# 	1: RGBA4444,
-# 	2: RGB565,
-# 	3: RGBA5551,
-	
-# 	#5: DXT5,
-
-# 	21: RGBA4444, # 32x32 block
-# 	22: RGB565, # 32x32 block
-# 	23: RGBA5551 # 32x32 block
-
-# 	#30: PVRTC_4BPP_RGBA,
-# 	#31: PVRTC_2BPP_RGBA,
-# 	#32: ETC1_RGB,
-# 	#33: ETC2_RGB,
-# 	#34: ETC2_RGBA,
-# 	#35: DXT1_RGB,
-# 	#36: DXT3_RGBA,
-# 	#37: DXT5_RGBA,
-# 	#38: ATITC_RGB,
-# 	#39: ATITC_RGBA,
-
-# 	#147: ETC1_RGB_A8,
-# 	#148: PVRTC_4BPP_RGB_A8,
-# 	#149: XRGB8888_A8,
-# 	#150: ETC1_RGB_A_Palette
-# }
-#def rsg_extract(RSG_NAME, RSG_OFFSET, IMAGE_FORMATS, image_decoders, file, out, pathout, level):
-def rsg_extract(RSG_NAME, file, pathout_data, out, pathout, level):
+def extract_file(name, RSG_NAME, DECODED_NAME, NAME_CHECK, file_data, texture, out, pathout, level):
+# Decrypt, decode & write a file of a RSG, texture is the decoder, width, height & pitch of a PTX
+	start = perf_counter()
+	if NAME_CHECK[-5:] == ".rton" and file_data[:2] == b"\x10\0" and 5 < level:
+		stage_start = perf_counter()
+		file_data = rijndael_cbc.decrypt(file_data[2:])
+		stats.add("decrypt", stage_start, len(file_data) + 2, len(file_data))
+
+	if NAME_CHECK[-5:] == ".rton" and 6 == level and file_data[:4] != b"RTON":
+		warning_message("No RTON " + name + ":" + DECODED_NAME)
+	else:
+		file_path = osjoin(out, DECODED_NAME)
+		if level > 6:
+			if NAME_CHECK[-5:] == ".rton":
+				# Decode in memory so a failed decode doesn't leave a partial JSON behind
+				file_path = osjoin(out, DECODED_NAME[:-5] + ".JSON")
+				output = BytesIO()
+				try:
+					stage_start = perf_counter()
+					write_root_data(output.write, file_data, 4, name + ":" + DECODED_NAME)
+					stats.add("rton decode", stage_start, len(file_data), output.tell())
+					writer.write(file_path, output.getbuffer(), "wrote " + relpath(file_path, pathout))
+				except Exception as e:
+					error_message(e, " in " + name + ": " + RSG_NAME + ":" + DECODED_NAME)
+			elif texture is not None:
+				try:
+					DECODER, WIDTH, HEIGHT, PITCH = texture
+					file_path = osjoin(out, splitext(DECODED_NAME)[0] + ".PNG")
+					output = BytesIO()
+					stage_start = perf_counter()
+					Image.fromarray(DECODER(file_data, WIDTH, HEIGHT, PITCH)).save(output, "PNG")
+					stats.add("ptx decode", stage_start, len(file_data), output.tell())
+					writer.write(file_path, output.getbuffer(), "wrote " + relpath(file_path, pathout))
+				except Exception as e:
+					error_message(e, " in " + name + ": " + RSG_NAME + ":" + DECODED_NAME)
+			else:
+				writer.write(file_path, file_data, "wrote " + relpath(file_path, pathout))
+		else:
+			writer.write(file_path, file_data, "wrote " + relpath(file_path, pathout))
+	stats.file(name + ":" + DECODED_NAME, start)
+def rsg_extract(RSG_NAME, name, header, textures, pathout_data, out, pathout, level):
 	try:
-		HEADER = file.read(4)
-		VERSION = unpack("<I", file.read(4))[0]
-		
-		file.seek(8, 1)
-		COMPRESSION_FLAGS = unpack("<I", file.read(4))[0]
-		HEADER_LENGTH = unpack("<I", file.read(4))[0]
-
-		DATA_OFFSET = unpack("<I", file.read(4))[0]
-		COMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-		DECOMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
+		COMPRESSION_FLAGS = header.compression_flags
+		DATA_OFFSET = header.data_offset
+		COMPRESSED_DATA_SIZE = header.compressed_data_size
+		DECOMPRESSED_DATA_SIZE = header.decompressed_data_size
+		IMAGE_DATA_OFFSET = header.image_data_offset
+		COMPRESSED_IMAGE_DATA_SIZE = header.compressed_image_data_size
+		DECOMPRESSED_IMAGE_DATA_SIZE = header.decompressed_image_data_size
+		INFO_OFFSET = header.info_offset
+		INFO_LIMIT = INFO_OFFSET + header.info_size
 		
-		file.seek(4, 1)
-		IMAGE_DATA_OFFSET = unpack("<I", file.read(4))[0]
-		COMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-		DECOMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-		
-		file.seek(20, 1)
-		INFO_SIZE = unpack("<I", file.read(4))[0]
-		INFO_OFFSET = unpack("<I", file.read(4))[0]
-		INFO_LIMIT = INFO_OFFSET + INFO_SIZE
+		if level < 5:
+			DATA_NEEDED = IMAGE_DATA_NEEDED = True
+		else:
+			# Only decompress the sections the selected files are in
+			DATA_NEEDED = IMAGE_DATA_NEEDED = False
+			FILE_LIST = []
+			start = perf_counter()
+			entries = rsg_file_list(pathout_data, INFO_OFFSET, INFO_LIMIT)
+			stats.add("name table", start, INFO_LIMIT - INFO_OFFSET)
+			for entry in entries:
+				DECODED_NAME = entry.name.replace("\\", sep)
+				NAME_CHECK = entry.name.replace("\\", "/").lower()
+				if DECODED_NAME and NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith):
+					if entry.is_image and entry.image < len(textures):
+						FILE_LIST.append((DECODED_NAME, NAME_CHECK, True, entry.offset, entry.size, textures[entry.image]))
+					else:
+						FILE_LIST.append((DECODED_NAME, NAME_CHECK, entry.is_image, entry.offset, entry.size, None))
+					if entry.is_image:
+						IMAGE_DATA_NEEDED = True
+					else:
+						DATA_NEEDED = True
 		
 		if COMPRESSION_FLAGS & 2 == 0: # Decompressed files
-			data = bytearray(pathout_data[DATA_OFFSET: DATA_OFFSET + COMPRESSED_DATA_SIZE])
+			data = pathout_data[DATA_OFFSET: DATA_OFFSET + COMPRESSED_DATA_SIZE]
 		elif COMPRESSED_DATA_SIZE != 0: # Compressed files
-			data = bytearray(decompress(pathout_data[DATA_OFFSET: DATA_OFFSET + COMPRESSED_DATA_SIZE]))
+			if DATA_NEEDED:
+				data = rsg_section(pathout_data, True, DATA_OFFSET, COMPRESSED_DATA_SIZE)
+			else:
+				skipped[0] += 1
+				skipped[1] += DECOMPRESSED_DATA_SIZE
 			
 		if DECOMPRESSED_IMAGE_DATA_SIZE != 0:
-			file.seek(IMAGE_DATA_OFFSET)
 			if COMPRESSION_FLAGS & 1 == 0: # Decompressed files
-				image_data = bytearray(pathout_data[IMAGE_DATA_OFFSET: IMAGE_DATA_OFFSET + COMPRESSED_IMAGE_DATA_SIZE])
-			else: # Compressed files
-				image_data = bytearray(decompress(pathout_data[IMAGE_DATA_OFFSET: IMAGE_DATA_OFFSET + COMPRESSED_IMAGE_DATA_SIZE]))
+				image_data = pathout_data[IMAGE_DATA_OFFSET: IMAGE_DATA_OFFSET + COMPRESSED_IMAGE_DATA_SIZE]
+			elif IMAGE_DATA_NEEDED: # Compressed files
+				image_data = rsg_section(pathout_data, True, IMAGE_DATA_OFFSET, COMPRESSED_IMAGE_DATA_SIZE)
+			else:
+				skipped[0] += 1
+				skipped[1] += DECOMPRESSED_IMAGE_DATA_SIZE
 		
 		if level < 5:
 			if COMPRESSION_FLAGS & 2 == 0 or COMPRESSED_DATA_SIZE != 0:
 				file_path = osjoin(out, RSG_NAME + ".section")
-				open(file_path, "wb").write(data)
-				print("wrote " + relpath(file_path, pathout))
+				writer.write(file_path, data, "wrote " + relpath(file_path, pathout))
 			if DECOMPRESSED_IMAGE_DATA_SIZE != 0:
 				image_path = osjoin(out, RSG_NAME + ".section2")
-				open(image_path, "wb").write(image_data)
-				print("wrote " + relpath(image_path, pathout))
+				writer.write(image_path, image_data, "wrote " + relpath(image_path, pathout))
 		else:
-			NAME_DICT = {}
-			temp = INFO_OFFSET
-			file.seek(INFO_OFFSET)
-			while temp < INFO_LIMIT:
-				FILE_NAME = b""
-				for key in list(NAME_DICT.keys()):
-					if NAME_DICT[key] + INFO_OFFSET < temp:
-						NAME_DICT.pop(key)
-					else:
-						FILE_NAME = key
-				BYTE = b""
-				while BYTE != b"\0":
-					FILE_NAME += BYTE
-					BYTE = file.read(1)
-					LENGTH = 4 * unpack("<I", file.read(3) + b"\0")[0]
-					if LENGTH != 0:
-						NAME_DICT[FILE_NAME] = LENGTH
-				
-				DECODED_NAME = FILE_NAME.decode().replace("\\", sep)
-				NAME_CHECK = DECODED_NAME.replace("\\", "/").lower()
-				IS_IMAGE = unpack("<I", file.read(4))[0] == 1
-				FILE_OFFSET = unpack("<I", file.read(4))[0]
-				FILE_SIZE = unpack("<I", file.read(4))[0]
+			extract = file_extractor(level)
+			for DECODED_NAME, NAME_CHECK, IS_IMAGE, FILE_OFFSET, FILE_SIZE, TEXTURE in FILE_LIST:
 				if IS_IMAGE:
-					file.seek(20, 1)
-					#IMAGE_ENTRY = unpack("<I", file.read(4))[0]
-					#file.seek(8, 1)
-					#WIDHT = unpack("<I", file.read(4))[0]
-					#HEIGHT = unpack("<I", file.read(4))[0]
-				if DECODED_NAME and NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith):
-					if IS_IMAGE:
-						file_data = image_data[FILE_OFFSET: FILE_OFFSET + FILE_SIZE]
-					else:
-						file_data = data[FILE_OFFSET: FILE_OFFSET + FILE_SIZE]
-					
-					if NAME_CHECK[-5:] == ".rton" and file_data[:2] == b"\x10\0" and 5 < level:
-						file_data = rijndael_cbc.decrypt(file_data[2:])
-
-					if NAME_CHECK[-5:] == ".rton" and 6 == level and file_data[:4] != b"RTON":
-						warning_message("No RTON " + file.name + ":" + DECODED_NAME)
-					else:
-						file_path = osjoin(out, DECODED_NAME)
-						makedirs(dirname(file_path), exist_ok = True)
-						if level > 6:
-							if NAME_CHECK[-5:] == ".rton":
-								try:
-									file_path = osjoin(out, DECODED_NAME[:-5] + ".JSON")
-									source = BytesIO(file_data)
-									source.name = file.name + ":" + DECODED_NAME
-									RTON_HEADER = source.read(4)
-									file_data = parse_root_object(source)
-									open(file_path, "wb").write(file_data)
-									print("wrote " + relpath(file_path, pathout))
-								except Exception as e:
-									error_message(e, " in " + file.name + ": " + RSG_NAME + ":" + DECODED_NAME + "pos: " + source.tell())
-							# elif IS_IMAGE:
-							# 	try:
-							# 	file_path = osjoin(out, splitext(DECODED_NAME)[0] + ".PNG")
-							# 	IMAGE_FORMAT = IMAGE_FORMATS[IMAGE_ENTRY]
-							# 	if IMAGE_FORMAT in [0, 1, 2, 3]: # Single Image
-							# 		image_decoders[IMAGE_FORMAT](file_data, WIDHT, HEIGHT).save(file_path)
-							# 		print("wrote " + relpath(file_path, pathout))
-							# 	elif IMAGE_FORMAT in [21, 23]: # 32x32 RGBABlock
-							# 		RGBABlock32x32(image_decoders[21], file_data, WIDHT, HEIGHT).save(file_path)
-							# 		print("wrote " + relpath(file_path, pathout))
-							# 	elif IMAGE_FORMAT == 22: # 32x32 RGBBlock
-							# 		RGBBlock32x32(image_decoders[IMAGE_FORMAT], file_data, WIDHT, HEIGHT).save(file_path)
-							# 		print("wrote " + relpath(file_path, pathout)
-							# 	except Exception as e:
-							# 		error_message(type(e).__name__ + " in " + file.name + ": " + RSG_NAME + ":" + DECODED_NAME + ": " + str(e))
-							else:
-								open(file_path, "wb").write(file_data)
-								print("wrote " + relpath(file_path, pathout))
-						else:
-							open(file_path, "wb").write(file_data)
-							print("wrote " + relpath(file_path, pathout))
-				temp = file.tell()
+					file_data = image_data[FILE_OFFSET: FILE_OFFSET + FILE_SIZE]
+				else:
+					file_data = data[FILE_OFFSET: FILE_OFFSET + FILE_SIZE]
+				
+				extract(name, RSG_NAME, DECODED_NAME, NAME_CHECK, file_data, TEXTURE, out, pathout, level)
 	except Exception as e:
-		error_message(e, " while extracting " + file.name)
+		error_message(e, " while extracting " + name)
 
-#def rsb_extract(file, out, level, image_decoders, pathout):
 def rsb_extract(file, pathout_data, out, level, pathout):
-	VERSION = unpack('<L', file.read(4))[0]
-
-	file.seek(4, 1)
-	HEADER_SIZE = unpack('<L', file.read(4))[0]
-
-	FILE_LIST_SIZE = unpack('<L', file.read(4))[0]
-	FILE_LIST_OFFSET = unpack('<L', file.read(4))[0]
-
-	file.seek(8, 1)
-	SUBGROUP_LIST_SIZE = unpack('<L', file.read(4))[0]
-	SUBGROUP_LIST_OFFSET = unpack('<L', file.read(4))[0]
-	SUBGROUP_INFO_ENTRIES = unpack("<I", file.read(4))[0]
-	SUBGROUP_INFO_OFFSET = unpack("<I", file.read(4))[0]
-	SUBGROUP_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	GROUP_INFO_ENTRIES = unpack('<L', file.read(4))[0]
-	GROUP_INFO_OFFSET = unpack('<L', file.read(4))[0]
-	GROUP_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	GROUP_LIST_SIZE = unpack('<L', file.read(4))[0]
-	GROUP_LIST_OFFSET = unpack('<L', file.read(4))[0]
-
-	AUTOPOOL_INFO_ENTRIES = unpack('<L', file.read(4))[0]
-	AUTOPOOL_INFO_OFFSET = unpack('<L', file.read(4))[0]
-	AUTOPOOL_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	PTX_INFO_ENTRIES = unpack('<L', file.read(4))[0]
-	PTX_INFO_OFFSET = unpack('<L', file.read(4))[0]
-	PTX_INFO_ENTRY_SIZE = unpack('<L', file.read(4))[0]
-
-	DIRECTORY_7_OFFSET = unpack('<L', file.read(4))[0]
-	DIRECTORY_8_OFFSET = unpack('<L', file.read(4))[0]
-	DIRECTORY_9_OFFSET = unpack('<L', file.read(4))[0]
-
-	if VERSION == 4:
-		HEADER_SIZE_2 = unpack('<L', file.read(4))[0]
-
-	# TEXTURE_FORMATS = []
-	# file.seek(DIRECTORY_6_OFFSET)
-	# for IMAGE_ID in range(0, DIRECTORY_6_ENTRIES):
-	# 	WIDHT = unpack("<I", file.read(4))[0]
-	# 	HEIGHT = unpack("<I", file.read(4))[0]
-	# 	WIDHT_BYTES = unpack("<I", file.read(4))[0]
-	# 	TEXTURE_FORMAT = unpack("<I", file.read(4))[0]
-	# 	if DIRECTORY_6_ENTRY_SIZE == 24:
-	# 		COMPRESSED_IMAGE_SIZE = unpack("<I", file.read(4))[0]
-	# 		HUNDRED = unpack("<I", file.read(4))[0]
-
-	# 	TEXTURE_FORMATS.append(TEXTURE_FORMAT)
-
-	file.seek(SUBGROUP_INFO_OFFSET)
-	for i in range(0, SUBGROUP_INFO_ENTRIES):
-		info_start = file.tell()
-		RSG_NAME = file.read(128).strip(b"\0").decode()
-		RSG_OFFSET = unpack("<I", file.read(4))[0]
-		RSG_SIZE = unpack("<I", file.read(4))[0]
-		SUBGROUP_ID = unpack("<I", file.read(4))[0]
-
-		RSG_COMPRESSION_FLAGS = unpack("<I", file.read(4))[0]
-		RSG_HEADER_LENGTH = unpack("<I", file.read(4))[0]
-
-		RSG_DATA_OFFSET = unpack("<I", file.read(4))[0]
-		RSG_COMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-		RSG_DECOMPRESSED_DATA_SIZE = unpack("<I", file.read(4))[0]
-		RSG_DECOMPRESSED_DATA_SIZE_B = unpack("<I", file.read(4))[0]
-		
-		RSG_IMAGE_DATA_OFFSET = unpack("<I", file.read(4))[0]
-		RSG_COMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-		RSG_DECOMPRESSED_IMAGE_DATA_SIZE = unpack("<I", file.read(4))[0]
-
-		file.seek(20, 1)
-		IMAGE_ENTRIES = unpack("<I", file.read(4))[0]
-		IMAGE_ID = unpack("<I", file.read(4))[0]
-		
+	rsb_header = RSBHeader.unpack_from(pathout_data)
+
+	decoders = ptx_decoders(file.name, level)
+	if decoders:
+		PTX_INFO = rsb_ptx_info(pathout_data, rsb_header)
+
+	pool = None
+	if 3 < level: # Workers decompress, decode & write whole RSGs
+		pool = worker_pool()
+	tasks = []
+	for info_start in rsb_subgroup_offsets(rsb_header):
+		info = SubgroupInfo.unpack_from(pathout_data, info_start)
+		RSG_NAME = info.name.strip(b"\0").decode()
 		RSG_CHECK = RSG_NAME.lower()
-		RSG_SIZE = RSG_IMAGE_DATA_OFFSET + RSG_COMPRESSED_IMAGE_DATA_SIZE
+		RSG_SIZE = info.image_data_offset + info.compressed_image_data_size
 		if RSG_CHECK.startswith(rsgStartsWith) and RSG_CHECK.endswith(rsgEndsWith):
-			subdata = pathout_data[RSG_OFFSET: RSG_OFFSET + RSG_SIZE]
-			subdata[:4] = b"pgsr"
-			subdata[16:36] = pathout_data[info_start + 140:info_start + 160]
-			subdata[40:52] = pathout_data[info_start + 164:info_start + 176]
+			textures = []
+			if decoders:
+				textures = ptx_textures(PTX_INFO[info.image_id: info.image_id + info.image_entries], decoders)
+			subdata = pathout_data[info.rsg_offset: info.rsg_offset + RSG_SIZE]
+			# Only the header is fixed up, the rest stays a view of the input
+			rsg_header = info.rsg_header(subdata)
 			if level < 4:
-				open(osjoin(out, RSG_NAME + ".rsg"), "wb").write(subdata)
-				print("wrote " + relpath(osjoin(out, RSG_NAME + ".rsg"), pathout))
+				data = bytearray(subdata)
+				rsg_header.pack_into(data)
+				file_path = osjoin(out, RSG_NAME + ".rsg")
+				writer.write(file_path, data, "wrote " + relpath(file_path, pathout))
+			elif pool is None:
+				rsg_extract(RSG_NAME, file.name + ":" + RSG_NAME, rsg_header, textures, subdata, out, pathout, level)
+			elif isinstance(file, NamedMap):
+			# Decompressed SMFs are only mapped in this process
+				tasks.append((RSG_NAME, file.name + ":" + RSG_NAME, rsg_header, textures, None, 0, 0, bytes(subdata), out, pathout, level))
 			else:
-				subfile = BytesIO(subdata)
-				subfile.name = file.name + ":" + RSG_NAME
-				rsg_extract(RSG_NAME, subfile, subdata, out, pathout, level)
-				#rsg_extract(RSG_NAME, RSG_OFFSET, TEXTURE_FORMATS[IMAGE_ID:IMAGE_ID + IMAGE_ENTRIES], image_decoders, file, out, pathout, level)
+			# Workers map the input themselves
+				tasks.append((RSG_NAME, file.name + ":" + RSG_NAME, rsg_header, textures, file.name, info.rsg_offset, RSG_SIZE, None, out, pathout, level))
+	if tasks:
+		replay(pool.imap(rsg_extract_task, tasks))
+def ptx_decoders(name, level):
+# PTX decoders for the textures of a RSB, ARGB8888 is ABGR8888 in OBBs
+	if level < 7 or Image is None:
+		return {}
+	elif name.lower().endswith(".obb"):
+		return obb_ptx_decoders
+	return rsb_ptx_decoders
+def rsg_section(pathout_data, COMPRESSED, OFFSET, SIZE):
+# Get a section of a RSG, decompress it if needed
+	if COMPRESSED:
+		start = perf_counter()
+		data = memoryview(decompress(pathout_data[OFFSET: OFFSET + SIZE]))
+		stats.add("decompress", start, SIZE, len(data))
+		return data
+	return pathout_data[OFFSET: OFFSET + SIZE]
+def rsb_index(pathout_data, selected = False):
+# Index the RSGs & files of a RSB with the md5 of every file, only the selected ones if the index isn't kept
+	rsb_header = RSBHeader.unpack_from(pathout_data)
+	PTX_INFO = rsb_ptx_info(pathout_data, rsb_header)
+	index = []
+	for info_start in rsb_subgroup_offsets(rsb_header):
+		info = SubgroupInfo.unpack_from(pathout_data, info_start)
+		RSG_NAME = info.name.strip(b"\0").decode()
+		RSG_CHECK = RSG_NAME.lower()
+		if selected and not (RSG_CHECK.startswith(rsgStartsWith) and RSG_CHECK.endswith(rsgEndsWith)):
+			continue
+		header = info.rsg_header(pathout_data, info.rsg_offset)
+		subdata = pathout_data[info.rsg_offset: info.rsg_offset + header.image_data_offset + header.compressed_image_data_size]
+		data = image_data = None
+		FILE_LIST = []
+		start = perf_counter()
+		entries = rsg_file_list(subdata, header.info_offset, header.info_offset + header.info_size)
+		stats.add("name table", start, header.info_size)
+		for entry in entries:
+			NAME_CHECK = entry.name.replace("\\", "/").lower()
+			if selected and not (entry.name and NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith)):
+				continue
+			# Sections are only decompressed once a file in them is hashed
+			if entry.is_image:
+				if image_data is None:
+					image_data = b""
+					if header.decompressed_image_data_size != 0:
+						image_data = rsg_section(subdata, header.compression_flags & 1, header.image_data_offset, header.compressed_image_data_size)
+				FILE_HASH = md5(image_data[entry.offset: entry.offset + entry.size]).hexdigest()
+			else:
+				if data is None:
+					data = b""
+					if header.compression_flags & 2 == 0 or header.compressed_data_size != 0:
+						data = rsg_section(subdata, header.compression_flags & 2, header.data_offset, header.compressed_data_size)
+				FILE_HASH = md5(data[entry.offset: entry.offset + entry.size]).hexdigest()
+			FILE_LIST.append((entry.name, entry.is_image, entry.offset, entry.size, FILE_HASH, entry.image))
+		index.append((RSG_NAME, info.rsg_offset, header.compression_flags, header.data_offset, header.compressed_data_size, header.decompressed_data_size, header.image_data_offset, header.compressed_image_data_size, header.decompressed_image_data_size, PTX_INFO[info.image_id: info.image_id + info.image_entries], FILE_LIST))
+	return index
+index_version = 1 # Older indexes are rebuilt
+def load_index(inp, pathout_data):
+# Load the index of a RSB from the file next to it, (re)build it if it's missing or outdated
+	index_path = inp + ".index"
+	file_stat = stat(inp)
+	if indexFiles:
+		try:
+			with open(index_path, "rb") as index_file:
+				index = load(index_file)
+			if index.get("version") == index_version and index["size"] == file_stat.st_size and index["mtime"] == file_stat.st_mtime_ns:
+				return index["rsgs"]
+		except (OSError, ValueError, KeyError):
+			pass
+	# Without a kept index only the selected files are hashed, the filters may change next time
+	rsgs = rsb_index(pathout_data, not indexFiles)
+	if indexFiles:
+		try:
+			with open(index_path, "w") as index_file:
+				dump({"version": index_version, "size": file_stat.st_size, "mtime": file_stat.st_mtime_ns, "rsgs": rsgs}, index_file, separators = (",", ":"))
+			print("wrote " + index_path)
+		except OSError as e:
+			warning_message("Failed to write index " + index_path + ": " + str(e))
+	return rsgs
+def rsb_index_extract(file, index, pathout_data, out, level, pathout):
+# Extract or list the selected files of an indexed RSB without parsing it
+	extract = file_extractor(level)
+	decoders = ptx_decoders(file.name, level)
+	for RSG_NAME, RSG_OFFSET, COMPRESSION_FLAGS, DATA_OFFSET, COMPRESSED_DATA_SIZE, DECOMPRESSED_DATA_SIZE, IMAGE_DATA_OFFSET, COMPRESSED_IMAGE_DATA_SIZE, DECOMPRESSED_IMAGE_DATA_SIZE, PTX_INFO, FILE_LIST in index:
+		RSG_CHECK = RSG_NAME.lower()
+		if RSG_CHECK.startswith(rsgStartsWith) and RSG_CHECK.endswith(rsgEndsWith):
+			try:
+				subdata = pathout_data[RSG_OFFSET: RSG_OFFSET + IMAGE_DATA_OFFSET + COMPRESSED_IMAGE_DATA_SIZE]
+				data = image_data = None
+				textures = ptx_textures([PTXInfo(*ptx) for ptx in PTX_INFO], decoders)
+				for FILE_NAME, IS_IMAGE, FILE_OFFSET, FILE_SIZE, FILE_HASH, FILE_IMAGE in FILE_LIST:
+					DECODED_NAME = FILE_NAME.replace("\\", sep)
+					NAME_CHECK = FILE_NAME.replace("\\", "/").lower()
+					if DECODED_NAME and NAME_CHECK.startswith(pathStartsWith) and NAME_CHECK.endswith(pathEndsWith):
+						if listFiles:
+							print(RSG_NAME + ":" + DECODED_NAME + " " + repr(FILE_SIZE) + " " + FILE_HASH)
+							continue
+						texture = None
+						if IS_IMAGE:
+							if image_data is None:
+								image_data = rsg_section(subdata, COMPRESSION_FLAGS & 1, IMAGE_DATA_OFFSET, COMPRESSED_IMAGE_DATA_SIZE)
+							file_data = image_data[FILE_OFFSET: FILE_OFFSET + FILE_SIZE]
+							if FILE_IMAGE < len(textures):
+								texture = textures[FILE_IMAGE]
+						else:
+							if data is None:
+								data = rsg_section(subdata, COMPRESSION_FLAGS & 2, DATA_OFFSET, COMPRESSED_DATA_SIZE)
+							file_data = data[FILE_OFFSET: FILE_OFFSET + FILE_SIZE]
+						extract(file.name + ":" + RSG_NAME, RSG_NAME, DECODED_NAME, NAME_CHECK, file_data, texture, out, pathout, level)
+				if not listFiles:
+					if data is None and COMPRESSION_FLAGS & 2 != 0 and COMPRESSED_DATA_SIZE != 0:
+						skipped[0] += 1
+						skipped[1] += DECOMPRESSED_DATA_SIZE
+					if image_data is None and COMPRESSION_FLAGS & 1 != 0 and DECOMPRESSED_IMAGE_DATA_SIZE != 0:
+						skipped[0] += 1
+						skipped[1] += DECOMPRESSED_IMAGE_DATA_SIZE
+			except Exception as e:
+				error_message(e, " while extracting " + file.name + ":" + RSG_NAME)
 def file_to_folder(inp, out, level, extensions, pathout):
 # Recursive file convert function
 	if isfile(inp):
@@ -421,32 +395,35 @@ def file_to_folder(inp, out, level, extensions, pathout):
 			COMPRESSED = HEADER == b"\xD4\xFE\xAD\xDE"
 			if COMPRESSED:
 				DECOMPRESSED_SIZE = unpack("<I", file.read(4))[0]
-				pathout_data = decompress(file.read())
+				start = perf_counter()
 				if level < 3:
-					open(out, "wb").write(pathout_data)
+					with temp_output(out) as output:
+						stats.add("decompress", start, stat(inp).st_size, decompress_stream(file, output))
 					print("wrote " + relpath(out, pathout))
 				else:
-					file = BytesIO(pathout_data)
-					file.name = inp
+					# Spill to a temporary file instead of keeping the RSB in memory
+					file = decompress_map(file, inp)
+					stats.add("decompress", start, stat(inp).st_size, len(file))
 					HEADER = file.read(4)
 			if HEADER == b"1bsr":
-				if not COMPRESSED:
-					pathout_data = HEADER + file.read()
-					file.seek(4)
+				if COMPRESSED:
+					pathout_data = memoryview(file)
+				else:
+					# Mapped pages are read as they're used, that time counts in the stage using them
+					pathout_data = memoryview(mmap(file.fileno(), 0, access = ACCESS_READ))
 				
-				# if file.[-4:] == ".obb":
-				# 	image_decoders = obb_image_decoders
-				# else:
-				# 	image_decoders = rsb_image_decoders
-				makedirs(out, exist_ok = True)
-				rsb_extract(file, bytearray(pathout_data), out, level, pathout)
-				#rsb_extract(file, out, level, image_decoders, pathout)
+				if level > 4 and (indexFiles or listFiles):
+					rsb_index_extract(file, load_index(inp, pathout_data), pathout_data, out, level, pathout)
+				else:
+					makedirs(out, exist_ok = True)
+					rsb_extract(file, pathout_data, out, level, pathout)
 			elif HEADER == b"pgsr":
-				pathout_data = HEADER + file.read()
+				if COMPRESSED:
+					pathout_data = memoryview(file)
+				else:
+					pathout_data = memoryview(mmap(file.fileno(), 0, access = ACCESS_READ))
 				makedirs(out, exist_ok = True)
-				file.seek(0)
-				rsg_extract("data", file, pathout_data, out, pathout, level)
-				#rsg_extract("data", 0, [], {} file, out, pathout, level)
+				rsg_extract("data", file.name, RSGHeader.unpack_from(pathout_data), [], pathout_data, out, pathout, level)
 			elif 2 < level:
 				warning_message("UNKNOWN 1BSR HEADER (" + HEADER.hex() + ") in " + inp)
 		except Exception as e:
@@ -461,66 +438,111 @@ def file_to_folder(inp, out, level, extensions, pathout):
 					file_to_folder(input_file, splitext(output_file)[0], level, extensions, pathout)
 			elif input_file != pathout:
 				file_to_folder(input_file, output_file, level, extensions, pathout)
+def conversion_file(inp, out, level, pathout):
+# Convert a single file
+	try:
+		start = perf_counter()
+		file = open(inp, "rb")
+		HEADER = file.read(2)
+		if HEADER == b"\x10\0":
+			if level < 7:
+				with temp_output(out) as output:
+					rijndael_cbc.decrypt_stream(file, output)
+					stats.add("decrypt", start, file.tell(), output.tell())
+				print("wrote " + relpath(out, pathout))
+		else:
+			HEADER += file.read(2)
+			if HEADER == b"RTON":
+				if level > 6:
+					with temp_output(out) as output:
+						write_root_object(file, output.write)
+						stats.add("rton decode", start, file.tell(), output.tell())
+					print("wrote " + relpath(out, pathout))
+			elif inp.lower()[-5:] != ".json":
+				warning_message("UNKNOWN RTON HEADER (" + HEADER.hex() + ") in " + inp)
+	except Exception as e:
+		error_message(e, " in " + inp + " pos " + repr(file.tell()))
+	stats.file(inp, start)
+def conversion_list(inp, out, level, extensions, noextensions, pathout, tasks):
+# Recursively list the files to convert, sorted by name
+	makedirs(out, exist_ok = True)
+	with scandir(inp) as entries:
+		entries = sorted(entries, key = lambda entry: entry.name)
+	for entry in entries:
+		input_file = entry.path
+		output_file = osjoin(out, entry.name)
+		if entry.is_file():
+			check = entry.name.lower()
+			if level > 6:
+				if check[-5:] == ".rton":
+					output_file = output_file[:-5]
+				output_file += ".json"
+			if check.endswith(extensions) or check.startswith(noextensions):
+				tasks.append((input_file, output_file, level, pathout))
+		elif entry.is_dir() and input_file != pathout:
+			conversion_list(input_file, output_file, level, extensions, noextensions, pathout, tasks)
 def conversion(inp, out, level, extensions, noextensions, pathout):
-# Recursive file convert function
+# Convert a file or all files in a directory
 	if isfile(inp):
-		try:
-			file = open(inp, "rb")
-			HEADER = file.read(2)
-			if HEADER == b"\x10\0":
-				if level < 7:
-					open(out,"wb").write(rijndael_cbc.decrypt(file.read()))
-					print("wrote " + relpath(out, pathout))
-			else:
-				HEADER += file.read(2)
-				if HEADER == b"RTON":
-					if level > 6:
-						data = parse_root_object(file)
-						open(out, "wb").write(data)
-						print("wrote " + relpath(out, pathout))
-				elif inp.lower()[-5:] != ".json":
-					warning_message("UNKNOWN RTON HEADER (" + HEADER.hex() + ") in " + inp)
-		except Exception as e:
-			error_message(e, " in " + inp + " pos " + repr(file.tell()))
+		conversion_file(inp, out, level, pathout)
 	elif isdir(inp):
-		makedirs(out, exist_ok = True)
-		for entry in listdir(inp):
-			input_file = osjoin(inp, entry)
-			output_file = osjoin(out, entry)
-			if isfile(input_file):
-				check = entry.lower()
-				if level > 6:
-					if check[-5:] == ".rton":
-						output_file = output_file[:-5]
-					output_file += ".json"
-				if check.endswith(extensions) or check.startswith(noextensions):
-					conversion(input_file, output_file, level, extensions, noextensions, pathout)
-			elif input_file != pathout:
-				conversion(input_file, output_file, level, extensions, noextensions, pathout)
-# Start of the code
-try:
-	application_path = initialize()
-	logerror = LogError(osjoin(application_path, "fail.txt"))
-	error_message = logerror.error_message
-	warning_message = logerror.warning_message
-	input_level = logerror.input_level
-	logerror.check_version(3, 9, 0)
-
-	print("""\033[95m
-\033[1mOBBUnpacker v1.2.0 (c) 2022 Nineteendo\033[22m
-\033[1mCode based on:\033[22m Luigi Auriemma, Small Pea & 1Zulu
-\033[1mDocumentation:\033[22m Watto Studios, YingFengTingYu, TwinKleS-C & h3x4n1um
-\033[1mFollow PyVZ2 development:\033[22m \033[4mhttps://discord.gg/CVZdcGKVSw\033[24m
-\033[0m""")
-	options = logerror.load_template(options, osjoin(application_path, "options"), 1)
-	level_to_name = ["SPECIFY", "SMF", "RSB", "RSG", "SECTION", "ENCRYPTED", "ENCODED", "DECODED"]
-	list_levels(level_to_name)
-	options["smfUnpackLevel"] = input_level("SMF Unpack Level", 1, 2, options["smfUnpackLevel"])
-	options["rsbUnpackLevel"] = input_level("RSB/SMF Unpack Level", 2, 3, options["rsbUnpackLevel"])
-	options["rsgUnpackLevel"] = input_level("RSG/RSB/SMF Unpack Level", 3, 7, options["rsgUnpackLevel"])
-	options["encryptedUnpackLevel"] = input_level("ENCRYPTED Unpack Level", 5, 6, options["encryptedUnpackLevel"])
-	options["encodedUnpackLevel"] = input_level("ENCODED Unpack Level", 6, 7, options["encodedUnpackLevel"])
-
+		tasks = []
+		conversion_list(inp, out, level, extensions, noextensions, pathout, tasks)
+		pool = worker_pool()
+		if pool is None:
+			for task in tasks:
+				conversion_file(*task)
+		else:
+			replay(pool.imap(conversion_task, tasks, 16))
+class FilePipeline:
+# Decrypt, decode & write files on the worker processes while the RSGs are extracted, at most limit bytes are pending
+	def __init__(self, pool, limit):
+		self.pool = pool
+		self.limit = limit
+		self.batch = []
+		self.batch_size = 0
+		self.pending = deque() # Results of the batches handed to the workers & their sizes, oldest first
+		self.pending_size = 0
+	def extract_file(self, name, RSG_NAME, DECODED_NAME, NAME_CHECK, file_data, texture, out, pathout, level):
+	# Add a file to the next batch, small files are sent together
+		self.batch.append((name, RSG_NAME, DECODED_NAME, NAME_CHECK, bytes(file_data), texture, out, pathout, level))
+		self.batch_size += len(file_data)
+		if len(self.batch) >= 64 or self.batch_size >= 1048576:
+			self.submit()
+	def submit(self):
+	# Hand the batch to the workers, waits for the oldest batches while too many bytes are pending
+		while self.pending and self.pending_size + self.batch_size > self.limit:
+			self.wait()
+		self.pending.append((self.pool.apply_async(extract_files_task, (self.batch,)), self.batch_size))
+		self.pending_size += self.batch_size
+		self.batch = []
+		self.batch_size = 0
+	def wait(self):
+	# Replay the result of the oldest batch
+		result, size = self.pending.popleft()
+		self.pending_size -= size
+		replay((result.get(),))
+	def flush(self):
+	# Wait until all files are extracted
+		if self.batch:
+			self.submit()
+		while self.pending:
+			self.wait()
+pool = None
+pipeline = None
+writer = None
+stats = None
+mapped_files = {}
+skipped = [0, 0] # Compressed sections and their decompressed bytes that weren't needed
+worker = False # True in the worker processes, they extract their files themselves
+def initialize_options(options, log):
+# Set the globals used by the unpack functions, also called in every worker process
+	global logerror, error_message, warning_message, rsgStartsWith, rsgEndsWith, indexFiles, listFiles, rijndael_cbc, pathStartsWith, pathEndsWith, write_root_object, write_root_data, writer, stats
+	logerror = log
+	error_message = log.error_message
+	warning_message = log.warning_message
+	stats = Stats(options["slowestFiles"])
+	writer = FileWriter(stats)
 	if options["rsgStartsWithIgnore"]:
 		rsgStartsWith = ""
 	else:
@@ -529,7 +551,8 @@ try:
 		rsgEndsWith = ""
 	else:
 		rsgEndsWith = options["rsgEndsWith"]
-
+	indexFiles = options["indexFiles"]
+	listFiles = options["listFiles"]
 	rijndael_cbc = RijndaelCBC(str.encode(options["encryptionKey"]), 24)
 	if options["pathEndsWithIgnore"]:
 		pathEndsWith = ""
@@ -539,7 +562,6 @@ try:
 		pathStartsWith = ""
 	else:
 		pathStartsWith = options["pathStartsWith"]
-
 	if options["comma"] > 0:
 		comma = b"," + b" " * options["comma"]
 	else:
@@ -560,50 +582,147 @@ try:
 	repairFiles = options["repairFiles"]
 	sortKeys = options["sortKeys"]
 	sortValues = options["sortValues"]
-	parse_root_object = RTONDecoder(comma, current_indent, doublePoint, ensureAscii, indent, repairFiles, sortKeys, sortValues, warning_message).parse_root_object
+	rton_decoder = RTONDecoder(comma, current_indent, doublePoint, ensureAscii, indent, repairFiles, sortKeys, sortValues, warning_message)
+	write_root_object = rton_decoder.write_root_object
+	write_root_data = rton_decoder.write_root_data
+def initialize_worker(options):
+# Worker processes keep their log in memory, it's sent back with the result
+	global worker
+	worker = True
+	initialize_options(options, LogError(None))
+def logged_task(function, args):
+# Call a function in a worker process, returns what was printed, logged, skipped and counted
+	logerror.fail = StringIO()
+	skipped[:] = [0, 0]
+	stats.reset()
+	with redirect_stdout(StringIO()) as output:
+		function(*args)
+	return (output.getvalue(), logerror.fail.getvalue(), tuple(skipped), stats.result())
+def replay(results):
+# Replay the results of worker tasks in order
+	for output, fail, (sections, size), result in results:
+		print(output, end = "")
+		logerror.log(fail)
+		skipped[0] += sections
+		skipped[1] += size
+		stats.merge(result)
+def conversion_task(task):
+# Convert a file in a worker process
+	return logged_task(conversion_file, task)
+def extract_files(tasks):
+# Extract files handed over by the pipeline
+	for task in tasks:
+		try:
+			extract_file(*task)
+		except Exception as e:
+			error_message(e, " while extracting " + task[0])
+def extract_files_task(tasks):
+# Extract a batch of files in a worker process
+	return logged_task(extract_files, (tasks,))
+def rsg_extract_task(task):
+# Extract a RSG in a worker process
+	RSG_NAME, name, header, textures, path, offset, size, subdata, out, pathout, level = task
+	if subdata is None:
+		if not path in mapped_files:
+			with open(path, "rb") as file:
+				mapped_files[path] = memoryview(mmap(file.fileno(), 0, access = ACCESS_READ))
+		subdata = mapped_files[path][offset: offset + size]
+	return logged_task(rsg_extract, (RSG_NAME, name, header, textures, subdata, out, pathout, level))
+def worker_pool():
+# Pool of worker processes, None if only 1 worker is used or in a worker process
+	global pool
+	if pool is None and options["workers"] > 1 and not worker:
+		pool = Pool(options["workers"], initialize_worker, (options,))
+	return pool
+def file_extractor(level):
+# Function extracting the files of a RSG, at level 7 they're decoded on the workers while extraction continues, only used for RSGs & indexed RSBs since RSBs hand whole RSGs to the workers
+	global pipeline
+	if level > 6 and worker_pool() is not None:
+		if pipeline is None:
+			pipeline = FilePipeline(pool, options["pipelineBytes"])
+		return pipeline.extract_file
+	return extract_file
+# Start of the code
+if __name__ == "__main__":
+	freeze_support()
+	try:
+		application_path = initialize()
+		logerror = LogError(osjoin(application_path, "fail.txt"))
+		error_message = logerror.error_message
+		warning_message = logerror.warning_message
+		input_level = logerror.input_level
+		logerror.check_version(3, 9, 0)
+
+		print("""\033[95m
+\033[1mOBBUnpacker v1.2.0 (c) 2022 Nineteendo\033[22m
+\033[1mCode based on:\033[22m Luigi Auriemma, Small Pea & 1Zulu
+\033[1mDocumentation:\033[22m Watto Studios, YingFengTingYu, TwinKleS-C & h3x4n1um
+\033[1mFollow PyVZ2 development:\033[22m \033[4mhttps://discord.gg/CVZdcGKVSw\033[24m
+\033[0m""")
+		options = logerror.load_template(options, osjoin(application_path, "options"), 1)
+		level_to_name = ["SPECIFY", "SMF", "RSB", "RSG", "SECTION", "ENCRYPTED", "ENCODED", "DECODED"]
+		list_levels(level_to_name)
+		options["smfUnpackLevel"] = input_level("SMF Unpack Level", 1, 2, options["smfUnpackLevel"])
+		options["rsbUnpackLevel"] = input_level("RSB/SMF Unpack Level", 2, 3, options["rsbUnpackLevel"])
+		options["rsgUnpackLevel"] = input_level("RSG/RSB/SMF Unpack Level", 3, 7, options["rsgUnpackLevel"])
+		options["encryptedUnpackLevel"] = input_level("ENCRYPTED Unpack Level", 5, 6, options["encryptedUnpackLevel"])
+		options["encodedUnpackLevel"] = input_level("ENCODED Unpack Level", 6, 7, options["encodedUnpackLevel"])
+
+		initialize_options(options, logerror)
 	
-	blue_print("\nWorking directory: " + getcwd())
-	if 2 >= options["smfUnpackLevel"] > 1:
-		smf_input = path_input("SMF Input file or directory", options["smfPacked"])
-		if isfile(smf_input):
-			smf_output = path_input("SMF " + level_to_name[options["smfUnpackLevel"]] + " Output file", options["smfUnpacked"])
-		else:
-			smf_output = path_input("SMF " + level_to_name[options["smfUnpackLevel"]] + " Output directory", options["smfUnpacked"])
-	if 3 >= options["rsbUnpackLevel"] > 2:
-		rsb_input = path_input("RSB/SMF Input file or directory", options["rsbPacked"])
-		rsb_output = path_input("RSB/SMF " + level_to_name[options["rsbUnpackLevel"]] + " Output directory", options["rsbUnpacked"])
-	if 7 >= options["rsgUnpackLevel"] > 3:
-		rsg_input = path_input("RSG/RSB/SMF Input file or directory", options["rsgPacked"])
-		rsg_output = path_input("RSG/RSB/SMF " + level_to_name[options["rsgUnpackLevel"]] + " Output directory", options["rsgUnpacked"])
-	if 6 >= options["encryptedUnpackLevel"] > 5:
-		encrypted_input = path_input("ENCRYPTED Input file or directory", options["encryptedPacked"])
-		if isfile(encrypted_input):
-			encrypted_output = path_input("ENCRYPTED " + level_to_name[options["encryptedUnpackLevel"]] + " Output file", options["encryptedUnpacked"])
-		else:
-			encrypted_output = path_input("ENCRYPTED " + level_to_name[options["encryptedUnpackLevel"]] + " Output directory", options["encryptedUnpacked"])
-	if 7 >= options["encodedUnpackLevel"] > 6:
-		encoded_input = path_input("ENCODED Input file or directory", options["encodedPacked"])
-		if isfile(encoded_input):
-			encoded_output = path_input("ENCODED " + level_to_name[options["encodedUnpackLevel"]] + " Output file", options["encodedUnpacked"])
-		else:
-			encoded_output = path_input("ENCODED " + level_to_name[options["encodedUnpackLevel"]] + " Output directory", options["encodedUnpacked"])
-
-	# Start file_to_folder
-	start_time = datetime.datetime.now()
-	if 2 >= options["smfUnpackLevel"] > 1:
-		file_to_folder(smf_input, smf_output, options["smfUnpackLevel"], options["smfExtensions"], dirname(smf_output))
-	if 3 >= options["rsbUnpackLevel"] > 2:
-		file_to_folder(rsb_input, rsb_output, options["rsbUnpackLevel"], options["rsbExtensions"], rsb_output)
-	if 7 >= options["rsgUnpackLevel"] > 3:
-		file_to_folder(rsg_input, rsg_output, options["rsgUnpackLevel"], options["rsgExtensions"], rsg_output)
-	if 6 >= options["encryptedUnpackLevel"] > 5:
-		conversion(encrypted_input, encrypted_output, options["encryptedUnpackLevel"], options["encryptedExtensions"], (), dirname(encrypted_output))
-	if 7 >= options["encodedUnpackLevel"] > 6:
-		conversion(encoded_input, encoded_output, options["encodedUnpackLevel"], options["RTONExtensions"], options["RTONNoExtensions"], dirname(encoded_output))
-
-	logerror.finish_program("finished unpacking in", start_time)
-except Exception as e:
-	error_message(e)
-except BaseException as e:
-	warning_message(type(e).__name__ + " : " + str(e))
-logerror.close() # Close log
\ No newline at end of file
+		blue_print("\nWorking directory: " + getcwd())
+		if 2 >= options["smfUnpackLevel"] > 1:
+			smf_input = path_input("SMF Input file or directory", options["smfPacked"])
+			if isfile(smf_input):
+				smf_output = path_input("SMF " + level_to_name[options["smfUnpackLevel"]] + " Output file", options["smfUnpacked"])
+			else:
+				smf_output = path_input("SMF " + level_to_name[options["smfUnpackLevel"]] + " Output directory", options["smfUnpacked"])
+		if 3 >= options["rsbUnpackLevel"] > 2:
+			rsb_input = path_input("RSB/SMF Input file or directory", options["rsbPacked"])
+			rsb_output = path_input("RSB/SMF " + level_to_name[options["rsbUnpackLevel"]] + " Output directory", options["rsbUnpacked"])
+		if 7 >= options["rsgUnpackLevel"] > 3:
+			rsg_input = path_input("RSG/RSB/SMF Input file or directory", options["rsgPacked"])
+			rsg_output = path_input("RSG/RSB/SMF " + level_to_name[options["rsgUnpackLevel"]] + " Output directory", options["rsgUnpacked"])
+		if 6 >= options["encryptedUnpackLevel"] > 5:
+			encrypted_input = path_input("ENCRYPTED Input file or directory", options["encryptedPacked"])
+			if isfile(encrypted_input):
+				encrypted_output = path_input("ENCRYPTED " + level_to_name[options["encryptedUnpackLevel"]] + " Output file", options["encryptedUnpacked"])
+			else:
+				encrypted_output = path_input("ENCRYPTED " + level_to_name[options["encryptedUnpackLevel"]] + " Output directory", options["encryptedUnpacked"])
+		if 7 >= options["encodedUnpackLevel"] > 6:
+			encoded_input = path_input("ENCODED Input file or directory", options["encodedPacked"])
+			if isfile(encoded_input):
+				encoded_output = path_input("ENCODED " + level_to_name[options["encodedUnpackLevel"]] + " Output file", options["encodedUnpacked"])
+			else:
+				encoded_output = path_input("ENCODED " + level_to_name[options["encodedUnpackLevel"]] + " Output directory", options["encodedUnpacked"])
+
+		# Start file_to_folder
+		start_time = datetime.datetime.now()
+		if 2 >= options["smfUnpackLevel"] > 1:
+			file_to_folder(smf_input, smf_output, options["smfUnpackLevel"], options["smfExtensions"], dirname(smf_output))
+		if 3 >= options["rsbUnpackLevel"] > 2:
+			file_to_folder(rsb_input, rsb_output, options["rsbUnpackLevel"], options["rsbExtensions"], rsb_output)
+		if 7 >= options["rsgUnpackLevel"] > 3:
+			file_to_folder(rsg_input, rsg_output, options["rsgUnpackLevel"], options["rsgExtensions"], rsg_output)
+		if 6 >= options["encryptedUnpackLevel"] > 5:
+			conversion(encrypted_input, encrypted_output, options["encryptedUnpackLevel"], options["encryptedExtensions"], (), dirname(encrypted_output))
+		if 7 >= options["encodedUnpackLevel"] > 6:
+			conversion(encoded_input, encoded_output, options["encodedUnpackLevel"], options["RTONExtensions"], options["RTONNoExtensions"], dirname(encoded_output))
+
+		if pipeline is not None:
+			pipeline.flush()
+		if skipped[0] > 0:
+			blue_print("skipped decompressing " + repr(skipped[0]) + " sections (" + repr(skipped[1]) + " bytes)")
+		try:
+			stats.finish(osjoin(application_path, "report.json"), (datetime.datetime.now() - start_time).total_seconds())
+		except OSError as e:
+			warning_message("Failed to write report: " + str(e))
+		logerror.finish_program("finished unpacking in", start_time)
+	except Exception as e:
+		error_message(e)
+	except BaseException as e:
+		warning_message(type(e).__name__ + " : " + str(e))
+	if pool is not None:
+		pool.close()
+		pool.join()
+	logerror.close() # Close log
\ No newline at end of file